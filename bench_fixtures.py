@@ -0,0 +1,175 @@
+"""Deterministic fixture PDFs with known ground truth for the benchmark suite, built locally with PyMuPDF.
+
+Usage:
+    python bench_fixtures.py fixtures/
+"""
+import argparse
+import io
+import json
+import os
+import random
+
+import fitz
+import numpy as np
+from PIL import Image
+
+PAGE_WIDTH, PAGE_HEIGHT = 612, 792
+MARGIN = 54
+GUTTER = 24
+FONT_SIZE = 11
+LINE_HEIGHT = 15
+HEADER_SIZE = 20
+# Ink above and below the baseline, as a fraction of the font size
+ASCENT = 0.75
+DESCENT = 0.25
+SCAN_DPI = 200
+# Fixed metadata so the same seed always gives byte-identical files
+METADATA = {"producer": "bench_fixtures", "creationDate": "D:20240101000000", "modDate": "D:20240101000000"}
+
+# name: [(columns, scanned), ...] per page; 0 columns is a blank page
+FIXTURES = {
+    "text_1col": [(1, False)] * 3,
+    "scan_1col": [(1, True)] * 2,
+    "scan_2col": [(2, True)] * 2,
+    "scan_3col": [(3, True)] * 2,
+    "mixed_2col": [(2, False), (2, True), (1, False), (1, True)],
+    "scan_blank": [(1, True), (0, True), (2, True), (0, True)],
+}
+
+
+def get_word_list(size: int = 3000) -> list:
+    """The most common words of TextBlob's dictionary, so fixture text is spelled correctly."""
+    from textblob.en import spelling
+    ranked = sorted(spelling.items(), key=lambda item: (-item[1], item[0]))
+    return [word for word, _ in ranked[:size] if word.isalpha() and len(word) > 1]
+
+
+def wrap_words(words, width: float, lines: int, rng: random.Random) -> list:
+    """Fills `lines` lines no wider than width with random words."""
+    wrapped = []
+    while len(wrapped) < lines:
+        line = []
+        while True:
+            word = rng.choice(words)
+            if line and fitz.get_text_length(" ".join(line + [word]), fontsize=FONT_SIZE) > width:
+                break
+            line.append(word)
+        wrapped.append(" ".join(line))
+    return wrapped
+
+
+def make_headline(words, min_width: float, max_width: float, rng: random.Random) -> str:
+    """A title-case headline at least min_width and at most max_width wide."""
+    while True:
+        line = [rng.choice(words)]
+        while fitz.get_text_length(" ".join(line).title(), fontsize=HEADER_SIZE) < min_width:
+            line.append(rng.choice(words))
+        headline = " ".join(line).title()
+        if fitz.get_text_length(headline, fontsize=HEADER_SIZE) <= max_width:
+            return headline
+
+
+def line_box(left: float, baseline: float, text: str, fontsize: float) -> list:
+    """Approximate ink bounds of a line of text, from cap height to descender, in PDF points."""
+    return [left, baseline - ASCENT * fontsize, left + fitz.get_text_length(text, fontsize=fontsize),
+            baseline + DESCENT * fontsize]
+
+
+def union(*boxes) -> list:
+    return [min(box[0] for box in boxes), min(box[1] for box in boxes),
+            max(box[2] for box in boxes), max(box[3] for box in boxes)]
+
+
+def draw_page(doc, columns: int, words, rng: random.Random) -> tuple:
+    """Adds a text page with an optional headline and `columns` columns.
+
+    Returns its ground truth and the ink bounds of each region the pipeline should find, in PDF
+    points and in reading order. Multi-column pages get a wide headline that crosses the gutters, which is
+    a region of its own, or a narrow one that fits in the first column and is read as part of it.
+    The ground truth follows the same reading order, with the lines of a region joined by spaces and
+    regions separated by newlines.
+    """
+    page = doc.new_page(width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    if not columns:
+        return "", []
+    regions, blocks = [], []
+    top = MARGIN
+    column_width = (PAGE_WIDTH - 2 * MARGIN - GUTTER * (columns - 1)) / columns
+    headline = None
+    if columns > 1:
+        wide = rng.random() < 0.5
+        if wide:
+            headline = make_headline(words, column_width + GUTTER * 2, PAGE_WIDTH - 2 * MARGIN, rng)
+        else:
+            headline = make_headline(words, column_width / 3, column_width, rng)
+        page.insert_text((MARGIN, top + HEADER_SIZE), headline, fontsize=HEADER_SIZE)
+        headline_box = line_box(MARGIN, top + HEADER_SIZE, headline, HEADER_SIZE)
+        if wide:
+            regions.append(headline)
+            blocks.append(headline_box)
+            headline = None
+        top += HEADER_SIZE * 3
+
+    lines_per_column = int((PAGE_HEIGHT - MARGIN - top) // LINE_HEIGHT)
+    for column in range(columns):
+        left = MARGIN + column * (column_width + GUTTER)
+        lines = wrap_words(words, column_width, lines_per_column, rng)
+        boxes = []
+        for row, line in enumerate(lines):
+            baseline = top + FONT_SIZE + row * LINE_HEIGHT
+            page.insert_text((left, baseline), line, fontsize=FONT_SIZE)
+            boxes.append(line_box(left, baseline, line, FONT_SIZE))
+        if column == 0 and headline:
+            lines = [headline] + lines
+            boxes.append(headline_box)
+        regions.append(" ".join(lines))
+        blocks.append(union(*boxes))
+    return "\n".join(regions), blocks
+
+
+def scan_page(doc, page_index: int, seed: int):
+    """Replaces a page with a noisy grayscale image of itself, so it has no text layer."""
+    pixmap = doc[page_index].get_pixmap(dpi=SCAN_DPI, colorspace=fitz.csGRAY, alpha=False)
+    pixels = np.frombuffer(pixmap.samples, dtype=np.uint8).reshape(pixmap.height, pixmap.width)
+    noise = np.random.default_rng(seed).normal(0, 12, pixels.shape)
+    noisy = np.clip(pixels.astype(np.float32) * 0.92 + 10 + noise, 0, 255).astype(np.uint8)
+    buffer = io.BytesIO()
+    Image.fromarray(noisy).save(buffer, format="PNG")
+
+    doc.delete_page(page_index)
+    page = doc.new_page(page_index, width=PAGE_WIDTH, height=PAGE_HEIGHT)
+    page.insert_image(page.rect, stream=buffer.getvalue())
+
+
+def build_fixture(path: str, layout, words, seed: int) -> dict:
+    rng = random.Random(seed)
+    doc = fitz.open()
+    pages = [draw_page(doc, columns, words, rng) for columns, _ in layout]
+    for page_index, (_, scanned) in enumerate(layout):
+        if scanned:
+            scan_page(doc, page_index, seed + page_index)
+    doc.set_metadata(METADATA)
+    doc.save(path, garbage=4, deflate=True, no_new_id=True)
+    doc.close()
+    return {"path": path, "truth": [truth for truth, _ in pages], "regions": [blocks for _, blocks in pages],
+            "columns": [columns for columns, _ in layout], "scanned": [scanned for _, scanned in layout]}
+
+
+def build_fixtures(directory: str, seed: int = 0) -> dict:
+    """Writes every fixture PDF and a manifest.json with its ground truth to directory and returns the manifest."""
+    os.makedirs(directory, exist_ok=True)
+    words = get_word_list()
+    manifest = {name: build_fixture(os.path.join(directory, f"{name}.pdf"), layout, words, seed + index * 1000)
+                for index, (name, layout) in enumerate(FIXTURES.items())}
+    with open(os.path.join(directory, "manifest.json"), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the benchmark fixture PDFs.")
+    parser.add_argument("directory", help="Where to write the PDFs and manifest.json.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the page text and scan noise.")
+    args = parser.parse_args()
+    for name, fixture in build_fixtures(args.directory, args.seed).items():
+        print(f"{fixture['path']}: {len(fixture['truth'])} page(s)")
@@ -0,0 +1,792 @@
+"""Benchmarks for the extraction pipeline.
+
+Usage:
+    python benchmark.py preprocess path/to/file.pdf [--pages 5] [--repeat 3] [--ocr]
+    python benchmark.py spelling path/to/corpus.txt [--symspell]
+    python benchmark.py columns path/to/file.pdf [--pages 5] [--repeat 3]
+    python benchmark.py ocr-batch path/to/file.pdf [--pages 8] [--windows 1 4 8] [--batch-sizes 1 16 32]
+    python benchmark.py suite [--skip-ocr] [--output results.json] [--baseline previous.json]
+    python benchmark.py resolution [path/to/file.pdf] [--pages 5] [--ocr]
+    python benchmark.py startup [--repeat 3] [--ocr] [--max-window-s 2] [--max-first-page-s 3]
+    python benchmark.py memory [path/to/file.pdf] [--pages 5]
+"""
+import argparse
+import ctypes
+import difflib
+import gc
+import json
+import logging
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import cv2
+import numpy as np
+from PIL import Image, ImageEnhance
+
+import fitz
+from bench_fixtures import build_fixtures
+from cli import ProgressReporter
+from full_implementation_1 import (ANALYSIS_DPI, DEFAULT_DPI, PREPROCESS_PROFILES, RESOLUTION_POLICIES,
+                                  crop_to_glyphs, detect_columns, find_glyphs, get_column_boxes, get_page_text,
+                                  get_reader, is_blank_page, iter_pdf_pages, join_page_text, main, ocr_regions,
+                                  prepare_page, prepare_pdf_page, preprocess_image, render_page)
+from result_cache import ocr_model_version
+from spell_corrector import SpellCorrector
+
+logger = logging.getLogger('PDFProcessor.benchmark')
+
+
+def legacy_preprocess_image(image, logger):
+    """The original PIL round-trip preprocessing, kept as the baseline to compare against."""
+    gray = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+    denoised = cv2.fastNlMeansDenoising(gray, None, h=10, templateWindowSize=7, searchWindowSize=21)
+    pil_img = Image.fromarray(denoised)
+    enhancer = ImageEnhance.Contrast(pil_img)
+    high_contrast = enhancer.enhance(2.5)
+    high_contrast = np.array(high_contrast)
+    binarized = cv2.adaptiveThreshold(high_contrast, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 15, 10)
+    kernel = np.ones((1, 1), np.uint8)
+    eroded = cv2.erode(binarized, kernel, iterations=50)
+    blurred = cv2.GaussianBlur(eroded, (5, 5), 0)
+    sharpened = cv2.addWeighted(eroded, 1.5, blurred, -0.5, 0)
+    return Image.fromarray(sharpened)
+
+
+def legacy_detect_columns(image, logger, headline_height_ratio=0.25, gap_threshold=100):
+    """The original Canny + HoughLinesP detector, kept as the baseline to compare against."""
+    gray = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
+    _, binary = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)
+    cols = np.where(np.sum(binary, axis=0) > 0)[0]
+    if len(cols) == 0:
+        return [image]
+    left, right = cols[0], cols[-1]
+    if right <= left:
+        return [image]
+    image = image.crop((left, 0, right, image.height))
+    width, height = image.size
+    headline_height = int(height * headline_height_ratio)
+    content_area = image.crop((0, headline_height, width, height))
+    gray = cv2.cvtColor(np.array(content_area), cv2.COLOR_RGB2GRAY)
+    edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=120, minLineLength=100, maxLineGap=10)
+    if lines is None:
+        return [image]
+    # reshape copes with both the (n, 1, 4) and (n, 4) layouts different OpenCV versions return
+    column_positions = sorted(min(x1, x2) for x1, _, x2, _ in lines.reshape(-1, 4))
+    max_gap = 0
+    best_divider = None
+    prev_x = 0
+    for x in column_positions:
+        gap = x - prev_x
+        if gap > max_gap:
+            max_gap = gap
+            best_divider = x
+        prev_x = x
+    if best_divider is None or max_gap < gap_threshold or best_divider <= 0 or best_divider >= width - 10:
+        return [image]
+    return [image.crop((0, 0, best_divider, height)), image.crop((min(best_divider + 10, width), 0, width, height))]
+
+
+def legacy_prepare_pdf_page(page, logger):
+    """prepare_pdf_page before PageBuffer: a PIL render that every stage converts to NumPy and gray on its own."""
+    image = render_page(page)
+    gray = cv2.cvtColor(np.asarray(image), cv2.COLOR_RGB2GRAY)
+    glyphs = find_glyphs(gray)
+    if is_blank_page(gray, glyphs):
+        return []
+    boxes = get_column_boxes(image, logger)
+    pixels = np.asarray(image)
+    text_boxes = [text_box for text_box in (crop_to_glyphs(box, glyphs) for box in boxes) if text_box]
+    return [(box, pixels[box[1]:box[3], box[0]:box[2]], 1.0) for box in text_boxes]
+
+
+def time_call(func, repeat: int):
+    """Returns (median seconds, last result) of calling func repeat times."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+
+def ocr_text(reader, image) -> str:
+    return ' '.join(text for _, text, _ in reader.readtext(np.asarray(image)))
+
+
+def bench_preprocess(args):
+    variants = {
+        "legacy": lambda image: legacy_preprocess_image(image, logger),
+        "quality": lambda image: preprocess_image(image, logger, "quality"),
+        "fast": lambda image: preprocess_image(image, logger, "fast"),
+    }
+    timings = {name: [] for name in variants}
+    pixel_diff = {name: [] for name in variants}
+    similarity = {name: [] for name in variants}
+    reader = get_reader(logger) if args.ocr else None
+
+    for i, image in iter_pdf_pages(args.pdf, logger):
+        if i >= args.pages:
+            break
+        outputs = {}
+        for name, func in variants.items():
+            seconds, result = time_call(lambda: func(image), args.repeat)
+            timings[name].append(seconds)
+            outputs[name] = np.asarray(result)
+
+        baseline = outputs["legacy"]
+        baseline_text = ocr_text(reader, baseline) if reader else None
+        for name, output in outputs.items():
+            pixel_diff[name].append(float(np.mean(output != baseline)))
+            if reader:
+                text = baseline_text if name == "legacy" else ocr_text(reader, output)
+                similarity[name].append(difflib.SequenceMatcher(None, baseline_text, text).ratio())
+
+    print(f"{'variant':<10}{'ms/page':>12}{'speedup':>10}{'pixels changed':>16}{'OCR similarity':>16}")
+    legacy_ms = statistics.mean(timings["legacy"]) * 1000
+    for name in variants:
+        ms = statistics.mean(timings[name]) * 1000
+        changed = statistics.mean(pixel_diff[name]) * 100
+        text_match = f"{statistics.mean(similarity[name]) * 100:.1f}%" if similarity[name] else "-"
+        print(f"{name:<10}{ms:>12.1f}{legacy_ms / ms:>9.2f}x{changed:>15.2f}%{text_match:>16}")
+
+
+def bench_spelling(args):
+    from textblob import TextBlob
+
+    with open(args.corpus, 'r', encoding='utf-8') as f:
+        # Blank-line separated chunks stand in for pages
+        pages = [chunk for chunk in f.read().split("\n\n") if chunk.strip()]
+
+    start = time.perf_counter()
+    reference = [str(TextBlob(page).correct()) for page in pages]
+    textblob_seconds = time.perf_counter() - start
+
+    variants = {"cached": SpellCorrector()}
+    if args.symspell:
+        variants["symspell"] = SpellCorrector(use_symspell=True)
+
+    print(f"{'variant':<10}{'seconds':>10}{'speedup':>10}{'pages matching':>16}")
+    print(f"{'textblob':<10}{textblob_seconds:>10.2f}{1:>9.2f}x{len(pages):>9}/{len(pages)}")
+    for name, corrector in variants.items():
+        start = time.perf_counter()
+        corrected = corrector.correct_texts(pages)
+        seconds = time.perf_counter() - start
+        matching = sum(a == b for a, b in zip(corrected, reference))
+        print(f"{name:<10}{seconds:>10.2f}{textblob_seconds / seconds:>9.2f}x{matching:>9}/{len(pages)}")
+
+
+def bench_columns(args):
+    variants = {
+        "hough": lambda image: legacy_detect_columns(image, logger),
+        "projection": lambda image: detect_columns(image, logger),
+    }
+    timings = {name: [] for name in variants}
+    print(f"{'page':<6}" + "".join(f"{name + ' regions':>20}" for name in variants))
+    for i, image in iter_pdf_pages(args.pdf, logger):
+        if i >= args.pages:
+            break
+        regions = []
+        for name, func in variants.items():
+            seconds, result = time_call(lambda: func(image), args.repeat)
+            timings[name].append(seconds)
+            regions.append(len(result))
+        print(f"{i + 1:<6}" + "".join(f"{count:>20}" for count in regions))
+
+    print(f"\n{'variant':<12}{'ms/page':>10}{'speedup':>10}")
+    hough_ms = statistics.mean(timings["hough"]) * 1000
+    for name in variants:
+        ms = statistics.mean(timings[name]) * 1000
+        print(f"{name:<12}{ms:>10.1f}{hough_ms / ms:>9.2f}x")
+
+
+def bench_ocr_batch(args):
+    reader = get_reader(logger)
+    pages = []
+    for i, image in iter_pdf_pages(args.pdf, logger):
+        if i >= args.pages:
+            break
+        pages.append([region for _, region, _ in prepare_page(image, logger)])
+    regions = sum(len(page) for page in pages)
+    print(f"{len(pages)} page(s), {regions} column region(s)\n")
+
+    def per_region():
+        # One readtext call per column crop, as before batching
+        return [join_page_text([reader.readtext(region) for region in page]) for page in pages]
+
+    def batched(window, batch_size):
+        texts = []
+        for start in range(0, len(pages), window):
+            chunk = pages[start:start + window]
+            results = ocr_regions([region for page in chunk for region in page], reader, batch_size)
+            for page in chunk:
+                texts.append(join_page_text(results[:len(page)]))
+                results = results[len(page):]
+        return texts
+
+    baseline_seconds, baseline = time_call(per_region, args.repeat)
+    print(f"{'variant':<24}{'pages/s':>10}{'speedup':>10}{'text similarity':>18}")
+    print(f"{'readtext per region':<24}{len(pages) / baseline_seconds:>10.2f}{1:>9.2f}x{'100.0%':>18}")
+    for window in args.windows:
+        for batch_size in args.batch_sizes:
+            seconds, texts = time_call(lambda: batched(window, batch_size), args.repeat)
+            similarity = statistics.mean(difflib.SequenceMatcher(None, a, b).ratio() for a, b in zip(baseline, texts))
+            name = f"window {window}, batch {batch_size}"
+            print(f"{name:<24}{len(pages) / seconds:>10.2f}{baseline_seconds / seconds:>9.2f}x"
+                  f"{similarity * 100:>17.1f}%")
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, or None where the resource module is missing (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+
+def summarize_latency(seconds) -> dict:
+    ms = np.array(seconds) * 1000
+    return {"count": len(ms), "mean_ms": round(float(ms.mean()), 2),
+            **{f"p{q}_ms": round(float(np.percentile(ms, q)), 2) for q in (50, 90, 99)},
+            "max_ms": round(float(ms.max()), 2)}
+
+
+def text_accuracy(expected: str, actual: str) -> float:
+    """Similarity of the two texts with whitespace normalized, from 0 to 1."""
+    return difflib.SequenceMatcher(None, " ".join(expected.split()), " ".join(actual.split()), autojunk=False).ratio()
+
+
+def word_accuracy(expected: str, actual: str) -> float:
+    expected_words, actual_words = expected.split(), actual.split()
+    matching = sum(a == b for a, b in zip(expected_words, actual_words))
+    return matching / max(len(expected_words), len(actual_words), 1)
+
+
+def add_typos(text: str, rng: random.Random, rate: float = 0.05) -> str:
+    """Swaps two neighbouring letters in about `rate` of the longer words."""
+    words = []
+    for word in text.split(" "):
+        if len(word) > 3 and rng.random() < rate:
+            i = rng.randrange(1, len(word) - 2)
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        words.append(word)
+    return " ".join(words)
+
+
+def regions_match(boxes, regions, dpi: int = DEFAULT_DPI, tolerance: float = 3.0) -> bool:
+    """True if boxes are the fixture's regions in reading order: one box per region, each holding the ink of
+    its own region and overlapping no other region's ink by more than tolerance points.
+
+    regions are ink bounds in PDF points, boxes are (left, top, right, bottom) pixels at dpi.
+    """
+    if len(boxes) != len(regions):
+        return False
+    scale = dpi / 72
+    margin = tolerance * scale
+    for i, (left, top, right, bottom) in enumerate(boxes):
+        for j, region in enumerate(regions):
+            x0, y0, x1, y1 = (value * scale for value in region)
+            if i == j:
+                if left > x0 + margin or top > y0 + margin or right < x1 - margin or bottom < y1 - margin:
+                    return False
+            elif min(right, x1) - max(left, x0) > margin and min(bottom, y1) - max(top, y0) > margin:
+                return False
+    return True
+
+
+def run_stages(manifest: dict, reader, repeat: int, seed: int):
+    """Times every pipeline stage on every fixture page. Returns ({stage: [seconds]}, {check: [score]})."""
+    timings = defaultdict(list)
+    scores = defaultdict(list)
+    corrector = SpellCorrector()
+    rng = random.Random(seed)
+
+    def timed(stage, func):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = func()
+            timings[stage].append(time.perf_counter() - start)
+        return result
+
+    for name, fixture in manifest.items():
+        logger.info(f"Timing pipeline stages on {name}")
+        with fitz.open(fixture["path"]) as doc:
+            for i, page in enumerate(doc):
+                truth = fixture["truth"][i]
+                if fixture["scanned"][i]:
+                    image = timed("render", lambda: render_page(page))
+                    gray = np.asarray(image.convert("L"))
+                    glyphs = timed("blank_check", lambda: find_glyphs(gray))
+                    blank = fixture["columns"][i] == 0
+                    scores["blank_pages"].append(float(is_blank_page(gray, glyphs) == blank))
+                    if blank:
+                        continue
+                    for profile in PREPROCESS_PROFILES:
+                        timed(f"preprocess_{profile}", lambda: preprocess_image(image, logger, profile))
+                    boxes = timed("columns", lambda: get_column_boxes(image, logger))
+                    scores["columns"].append(float(regions_match(boxes, fixture["regions"][i])))
+                    if reader:
+                        pixels = np.asarray(image)
+                        regions = [pixels[top:bottom, left:right] for left, top, right, bottom in boxes]
+                        results = timed("ocr", lambda: ocr_regions(regions, reader))
+                        scores["ocr"].append(text_accuracy(truth, join_page_text(results)))
+                else:
+                    text = timed("text_layer", lambda: get_page_text(page))
+                    scores["text_layer"].append(text_accuracy(truth, text))
+
+                misspelled = add_typos(truth, rng)
+                corrected = timed("spelling", lambda: corrector.correct(misspelled))
+                scores["spelling"].append(word_accuracy(truth, corrected))
+    return timings, scores
+
+
+def run_documents(manifest: dict, output_dir: str, skip_ocr: bool) -> dict:
+    """Runs main() end to end on every fixture and returns throughput and accuracy per document."""
+    documents = {}
+    for name, fixture in manifest.items():
+        needs_ocr = any(fixture["scanned"])
+        if skip_ocr and needs_ocr:
+            continue
+        logger.info(f"Running main() on {name}")
+        start = time.perf_counter()
+        result = main(fixture["path"], output_dir, logger, ProgressReporter(), basic=not needs_ocr, spellcheck=False,
+                      hybrid=needs_ocr, use_cache=False, output_formats=("jsonl",))
+        seconds = time.perf_counter() - start
+        texts = {}
+        if result["output_path"]:
+            with open(result["output_path"], 'r', encoding='utf-8') as f:
+                texts = {record["page"] - 1: record["text"] for record in map(json.loads, f)}
+        documents[name] = {
+            "pages": result["pages"], "blank_pages": result["blank_pages"], "seconds": round(seconds, 3),
+            "pages_per_s": round(result["pages"] / seconds, 3),
+            "accuracy": round(statistics.mean(text_accuracy(truth, texts.get(i, ""))
+                                              for i, truth in enumerate(fixture["truth"])), 4),
+        }
+    return documents
+
+
+def compare_results(current: dict, baseline: dict, tolerance: float) -> list:
+    """Lists what got slower by more than tolerance, or less accurate by more than a point, since baseline."""
+    regressions = []
+    for stage, stats in current["stages"].items():
+        before = baseline.get("stages", {}).get(stage)
+        if before and stats["p50_ms"] > before["p50_ms"] * (1 + tolerance):
+            regressions.append(f"stage {stage}: p50 {before['p50_ms']} ms -> {stats['p50_ms']} ms")
+    for name, stats in current["documents"].items():
+        before = baseline.get("documents", {}).get(name)
+        if before and stats["pages_per_s"] < before["pages_per_s"] * (1 - tolerance):
+            regressions.append(f"document {name}: {before['pages_per_s']} -> {stats['pages_per_s']} pages/s")
+        if before and stats["accuracy"] < before["accuracy"] - 0.01:
+            regressions.append(f"document {name}: accuracy {before['accuracy']} -> {stats['accuracy']}")
+    for check, score in current["accuracy"].items():
+        before = baseline.get("accuracy", {}).get(check)
+        if before is not None and score < before - 0.01:
+            regressions.append(f"accuracy {check}: {before} -> {score}")
+    return regressions
+
+
+def bench_suite(args):
+    with tempfile.TemporaryDirectory() as work_dir:
+        fixtures_dir = args.fixtures or os.path.join(work_dir, "fixtures")
+        manifest = build_fixtures(fixtures_dir, args.seed)
+        reader = None if args.skip_ocr else get_reader(logger)
+        timings, scores = run_stages(manifest, reader, args.repeat, args.seed)
+        documents = run_documents(manifest, work_dir, args.skip_ocr)
+
+    results = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "environment": {"python": platform.python_version(), "platform": platform.platform(),
+                        "cpus": os.cpu_count(), "numpy": np.__version__, "opencv": cv2.__version__,
+                        "pymupdf": fitz.VersionBind, "ocr_model": ocr_model_version()},
+        "settings": {"seed": args.seed, "repeat": args.repeat, "skip_ocr": args.skip_ocr},
+        "stages": {stage: summarize_latency(seconds) for stage, seconds in timings.items()},
+        "documents": documents,
+        "accuracy": {check: round(statistics.mean(values), 4) for check, values in scores.items()},
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+    print(f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}")
+    for stage, stats in results["stages"].items():
+        print(f"{stage:<22}{stats['count']:>7}{stats['p50_ms']:>10.1f}{stats['p90_ms']:>10.1f}{stats['p99_ms']:>10.1f}")
+    print(f"\n{'document':<22}{'pages':>7}{'pages/s':>10}{'accuracy':>10}")
+    for name, stats in documents.items():
+        print(f"{name:<22}{stats['pages']:>7}{stats['pages_per_s']:>10.2f}{stats['accuracy'] * 100:>9.1f}%")
+    print(f"\n{'check':<22}{'accuracy':>10}")
+    for check, score in results["accuracy"].items():
+        print(f"{check:<22}{score * 100:>9.1f}%")
+    print(f"\nPeak RSS: {results['peak_rss_mb']} MB")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"Results saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare_results(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+def rendered_pixels(page, policy: str, regions) -> int:
+    """Pixels rendered for a page: the full page at DEFAULT_DPI, or the analysis render plus every region."""
+    def page_pixels(dpi):
+        return round(page.rect.width * dpi / 72) * round(page.rect.height * dpi / 72)
+    if policy == "fixed":
+        return page_pixels(DEFAULT_DPI)
+    return page_pixels(ANALYSIS_DPI) + sum(region.shape[0] * region.shape[1] for _, region, _ in regions)
+
+
+def bench_resolution(args):
+    with tempfile.TemporaryDirectory() as work_dir:
+        if args.pdf:
+            sources = {os.path.basename(args.pdf): {"path": args.pdf, "truth": None}}
+        else:
+            # Scanned fixture pages, where the text height is known to vary with the layout
+            manifest = build_fixtures(os.path.join(work_dir, "fixtures"), args.seed)
+            sources = {name: fixture for name, fixture in manifest.items() if all(fixture["scanned"])}
+        reader = get_reader(logger) if args.ocr else None
+
+        pixels = {policy: 0 for policy in RESOLUTION_POLICIES}
+        seconds = {policy: 0.0 for policy in RESOLUTION_POLICIES}
+        scores = {policy: [] for policy in RESOLUTION_POLICIES}
+        print(f"{'document':<16}{'page':>5}{'fixed Mpx':>11}{'adaptive Mpx':>14}{'ratio':>8}  region DPIs")
+        for name, source in sources.items():
+            with fitz.open(source["path"]) as doc:
+                for i, page in enumerate(doc):
+                    if i >= args.pages:
+                        break
+                    page_pixels, texts, dpis = {}, {}, []
+                    for policy in RESOLUTION_POLICIES:
+                        start = time.perf_counter()
+                        regions = prepare_pdf_page(page, logger, policy)
+                        seconds[policy] += time.perf_counter() - start
+                        page_pixels[policy] = rendered_pixels(page, policy, regions)
+                        pixels[policy] += page_pixels[policy]
+                        if policy == "adaptive":
+                            dpis = [round(DEFAULT_DPI / scale) for _, _, scale in regions]
+                        if reader:
+                            texts[policy] = join_page_text(ocr_regions([region for _, region, _ in regions], reader))
+
+                    if reader:
+                        # Without ground truth the fixed policy is the reference
+                        truth = source["truth"][i] if source["truth"] else texts["fixed"]
+                        for policy in RESOLUTION_POLICIES:
+                            scores[policy].append(text_accuracy(truth, texts[policy]))
+                    fixed, adaptive = page_pixels["fixed"], page_pixels["adaptive"]
+                    print(f"{name:<16}{i + 1:>5}{fixed / 1e6:>11.2f}{adaptive / 1e6:>14.2f}"
+                          f"{adaptive / fixed:>8.2f}  {dpis}")
+
+    print(f"\n{'policy':<10}{'Mpx':>10}{'render+layout s':>17}{'OCR accuracy':>14}")
+    for policy in RESOLUTION_POLICIES:
+        accuracy = f"{statistics.mean(scores[policy]) * 100:.1f}%" if scores[policy] else "-"
+        print(f"{policy:<10}{pixels[policy] / 1e6:>10.2f}{seconds[policy]:>17.2f}{accuracy:>14}")
+    return 0
+
+
+# Libraries that must not be loaded before the stage that needs them runs
+HEAVY_MODULES = ("torch", "easyocr", "cv2", "textblob", "pandas", "openpyxl")
+# Milliseconds the window probe keeps the event loop running after the window is drawn
+WINDOW_IDLE_MS = 2000
+
+# Run in a fresh interpreter: argv is the repository directory. Prints when the window was drawn, or null
+# when there is no display and only the import could be measured. The window is then left idle long enough
+# for callbacks scheduled at startup to run, so modules they import in the background are listed too.
+WINDOW_PROBE = """
+import json, sys, threading, time
+sys.path.insert(0, sys.argv[1])
+import tkinter as tk
+import ui
+imported = time.time()
+try:
+    root = tk.Tk()
+except tk.TclError:
+    root = None
+if root is not None:
+    ui.ExcelProcessorApp(root)
+    root.update()
+    shown = time.time()
+    root.after(%d, root.quit)
+    root.mainloop()
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(5)
+    root.destroy()
+print(json.dumps({"imported": imported, "shown": shown if root is not None else None,
+                  "modules": sorted({name.split('.')[0] for name in sys.modules})}))
+""" % WINDOW_IDLE_MS
+
+# Run in a fresh interpreter: argv is the repository directory, a one-page PDF, the output directory and
+# "text" or "ocr". Prints when the page was written.
+FIRST_PAGE_PROBE = """
+import json, logging, queue, sys, time
+sys.path.insert(0, sys.argv[1])
+from full_implementation_1 import main
+result = main(sys.argv[2], sys.argv[3], logging.getLogger("startup"), queue.Queue(), sys.argv[4] == "text", False,
+              hybrid=True, use_cache=False)
+print(json.dumps({"done": time.time(), "pages": result["pages"],
+                  "modules": sorted({name.split('.')[0] for name in sys.modules})}))
+"""
+
+
+def run_probe(probe: str, *argv, cwd: str = None) -> tuple:
+    """Runs probe in a new interpreter and returns (seconds from launch to each reported time, its output)."""
+    start = time.time()
+    completed = subprocess.run([sys.executable, "-c", probe, os.path.dirname(os.path.abspath(__file__)), *argv],
+                               capture_output=True, text=True, cwd=cwd)
+    if completed.returncode != 0:
+        raise RuntimeError(f"Startup probe failed:\n{completed.stderr}")
+    output = json.loads(completed.stdout.strip().splitlines()[-1])
+    seconds = {key: value - start for key, value in output.items() if isinstance(value, float)}
+    return seconds, output
+
+
+def bench_startup(args):
+    """Cold start: time from launching Python to the window being drawn and to the first page being written."""
+    failures = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        manifest = build_fixtures(os.path.join(work_dir, "fixtures"), args.seed)
+        documents = {"text": manifest["text_1col"]["path"]}
+        if args.ocr:
+            documents["ocr"] = manifest["scan_1col"]["path"]
+        for mode, path in documents.items():
+            # One page, so the time to the first page is the time to the finished document
+            with fitz.open(path) as doc:
+                doc.select([0])
+                documents[mode] = os.path.join(work_dir, f"first_page_{mode}.pdf")
+                doc.save(documents[mode])
+
+        window, imported, window_modules = [], [], set()
+        for _ in range(args.repeat):
+            seconds, output = run_probe(WINDOW_PROBE, cwd=work_dir)
+            imported.append(seconds["imported"])
+            if "shown" in seconds:
+                window.append(seconds["shown"])
+            window_modules.update(output["modules"])
+
+        first_page = {mode: [] for mode in documents}
+        page_modules = {mode: set() for mode in documents}
+        for mode, path in documents.items():
+            for _ in range(args.repeat):
+                output_dir = tempfile.mkdtemp(dir=work_dir)
+                seconds, output = run_probe(FIRST_PAGE_PROBE, path, output_dir, mode, cwd=work_dir)
+                if output["pages"] != 1:
+                    raise RuntimeError(f"Startup probe wrote {output['pages']} page(s) of {path}")
+                first_page[mode].append(seconds["done"])
+                page_modules[mode].update(output["modules"])
+
+    print(f"{'measure':<24}{'median s':>10}{'target s':>10}  heavy modules loaded")
+    heavy = ", ".join(name for name in HEAVY_MODULES if name in window_modules) or "-"
+    print(f"{'import ui':<24}{statistics.median(imported):>10.2f}{'':>10}  {heavy}")
+    if window:
+        print(f"{'time to window':<24}{statistics.median(window):>10.2f}{args.max_window_s:>10.2f}")
+        if statistics.median(window) > args.max_window_s:
+            failures.append(f"time to window {statistics.median(window):.2f}s > {args.max_window_s:.2f}s")
+    else:
+        print("time to window: no display, only the import of ui was measured")
+        if statistics.median(imported) > args.max_window_s:
+            failures.append(f"import of ui {statistics.median(imported):.2f}s > {args.max_window_s:.2f}s")
+    for mode, seconds in first_page.items():
+        heavy = ", ".join(name for name in HEAVY_MODULES if name in page_modules[mode]) or "-"
+        target = f"{args.max_first_page_s:>10.2f}" if mode == "text" else f"{'':>10}"
+        print(f"{'first page (' + mode + ')':<24}{statistics.median(seconds):>10.2f}{target}  {heavy}")
+    if statistics.median(first_page["text"]) > args.max_first_page_s:
+        failures.append(f"first text-layer page {statistics.median(first_page['text']):.2f}s > "
+                        f"{args.max_first_page_s:.2f}s")
+    for name in ("torch", "easyocr"):
+        if name in window_modules:
+            failures.append(f"importing ui loads {name}")
+        if name in page_modules["text"]:
+            failures.append(f"extracting a text-layer page loads {name}")
+
+    for failure in failures:
+        print(f"FAILED {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+def process_memory(field: str = "VmRSS"):
+    """A memory figure of this process from /proc/self/status in bytes, or None where there is no /proc (Windows)."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(f"{field}:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        return None
+
+
+def reset_peak_rss() -> bool:
+    """Frees what the allocators hold on to and restarts the peak RSS count (Linux only)."""
+    gc.collect()
+    try:
+        ctypes.CDLL("libc.so.6").malloc_trim(0)
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+    except OSError:
+        return False
+    return True
+
+
+def held_bytes(regions) -> int:
+    """Size of every whole buffer the regions keep alive, counting each buffer once.
+
+    A region that is a view keeps the array it was sliced from, and an array wrapping a pixmap keeps the
+    pixmap's samples, so the root of each region's base chain is what it holds.
+    """
+    roots = {}
+    for _, region, _ in regions:
+        while isinstance(region.base, np.ndarray):
+            region = region.base
+        roots[id(region)] = region.nbytes
+    return sum(roots.values())
+
+
+def bench_memory(args):
+    """Memory used to prepare a page for OCR, before and after pages were kept in a PageBuffer.
+
+    Peak and held RSS include what MuPDF, PIL and NumPy allocate outside Python's view. Before each
+    page the allocators return free memory to the system and the peak is reset, so the figures cover
+    that page alone. RSS is only measured on Linux. Held buffers and pixmap bytes are counted from the
+    objects themselves on every platform.
+    """
+    variants = {"legacy": lambda page: legacy_prepare_pdf_page(page, logger),
+                "page_buffer": lambda page: prepare_pdf_page(page, logger)}
+    results = {name: defaultdict(list) for name in variants}
+    pixmap_bytes = []
+    get_pixmap = fitz.Page.get_pixmap
+
+    def counted_get_pixmap(page, *pixmap_args, **pixmap_kwargs):
+        pixmap = get_pixmap(page, *pixmap_args, **pixmap_kwargs)
+        pixmap_bytes.append(pixmap.stride * pixmap.height)
+        return pixmap
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        if args.pdf:
+            paths = [args.pdf]
+        else:
+            manifest = build_fixtures(os.path.join(work_dir, "fixtures"), args.seed)
+            paths = [fixture["path"] for fixture in manifest.values() if all(fixture["scanned"])]
+        fitz.Page.get_pixmap = counted_get_pixmap
+        try:
+            for path in paths:
+                with fitz.open(path) as doc:
+                    # The first page of each variant warms up caches and allocator pools and is not counted
+                    for func in variants.values():
+                        func(doc[0])
+                    for i, page in enumerate(doc):
+                        if i >= args.pages:
+                            break
+                        for name, func in variants.items():
+                            measured = reset_peak_rss()
+                            before = process_memory()
+                            pixmap_bytes.clear()
+                            start = time.perf_counter()
+                            regions = func(page)
+                            results[name]["seconds"].append(time.perf_counter() - start)
+                            peak = process_memory("VmHWM")
+                            reset_peak_rss()
+                            if measured and before is not None:
+                                results[name]["peak"].append(peak - before)
+                                results[name]["held"].append(process_memory() - before)
+                            results[name]["regions"].append(held_bytes(regions))
+                            results[name]["pixmaps"].append(sum(pixmap_bytes))
+                            del regions
+        finally:
+            fitz.Page.get_pixmap = get_pixmap
+
+    def mb(values):
+        return f"{statistics.mean(values) / 2 ** 20:.2f}" if values else "-"
+
+    print(f"{'variant':<14}{'peak RSS MB':>13}{'held RSS MB':>13}{'held buffers MB':>17}{'pixmaps MB':>12}"
+          f"{'ms':>8}   (per page)")
+    for name, result in results.items():
+        print(f"{name:<14}{mb(result['peak']):>13}{mb(result['held']):>13}{mb(result['regions']):>17}"
+              f"{mb(result['pixmaps']):>12}{statistics.mean(result['seconds']) * 1000:>8.1f}")
+    print("peak/held RSS: growth of the process while preparing the page / once only its regions are kept.")
+    print("held buffers: whole buffers the regions handed to OCR keep alive; pixmaps: MuPDF pixmaps rendered.")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmarks for the PDF extraction pipeline.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    preprocess = subparsers.add_parser("preprocess", help="Compare preprocess_image against the legacy pipeline.")
+    preprocess.add_argument("pdf", help="PDF whose pages are used as input.")
+    preprocess.add_argument("--pages", type=int, default=5, help="Number of pages to benchmark.")
+    preprocess.add_argument("--repeat", type=int, default=3, help="Timed runs per page; the median is reported.")
+    preprocess.add_argument("--ocr", action="store_true", help="Also compare the OCR text of each variant.")
+    preprocess.set_defaults(func=bench_preprocess)
+
+    spelling = subparsers.add_parser("spelling", help="Compare the spelling corrector against TextBlob.")
+    spelling.add_argument("corpus", help="UTF-8 text file; blank lines separate pages.")
+    spelling.add_argument("--symspell", action="store_true", help="Also time the SymSpell index (includes build time).")
+    spelling.set_defaults(func=bench_spelling)
+
+    columns = subparsers.add_parser("columns", help="Compare detect_columns against the Hough line detector.")
+    columns.add_argument("pdf", help="PDF whose pages are used as input.")
+    columns.add_argument("--pages", type=int, default=5, help="Number of pages to benchmark.")
+    columns.add_argument("--repeat", type=int, default=3, help="Timed runs per page; the median is reported.")
+    columns.set_defaults(func=bench_columns)
+
+    ocr_batch = subparsers.add_parser("ocr-batch", help="Compare batched OCR of column crops with one call per crop.")
+    ocr_batch.add_argument("pdf", help="PDF whose pages are used as input.")
+    ocr_batch.add_argument("--pages", type=int, default=8, help="Number of pages to benchmark.")
+    ocr_batch.add_argument("--repeat", type=int, default=1, help="Timed runs per variant; the median is reported.")
+    ocr_batch.add_argument("--windows", type=int, nargs="+", default=[1, 4, 8], help="Batch windows (pages) to try.")
+    ocr_batch.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 16, 32],
+                           help="Recognizer batch sizes to try.")
+    ocr_batch.set_defaults(func=bench_ocr_batch)
+
+    suite = subparsers.add_parser("suite", help="Time every stage and main() on generated fixture PDFs.")
+    suite.add_argument("--fixtures", help="Keep the generated fixture PDFs in this directory.")
+    suite.add_argument("--seed", type=int, default=0, help="Seed for the fixture text, scan noise and typos.")
+    suite.add_argument("--repeat", type=int, default=1, help="Timed runs per stage and page.")
+    suite.add_argument("--skip-ocr", action="store_true", help="Leave out OCR, for machines without the model.")
+    suite.add_argument("--output", default="benchmark_results.json", help="Where to save the results as JSON.")
+    suite.add_argument("--baseline", help="Earlier results to compare against; regressions give exit code 1.")
+    suite.add_argument("--tolerance", type=float, default=0.1, help="Allowed slowdown before a stage is flagged.")
+    suite.set_defaults(func=bench_suite)
+
+    resolution = subparsers.add_parser("resolution", help="Compare pixels rendered by the fixed and adaptive DPI.")
+    resolution.add_argument("pdf", nargs="?", help="PDF to use instead of the generated scanned fixtures.")
+    resolution.add_argument("--pages", type=int, default=5, help="Pages per document to benchmark.")
+    resolution.add_argument("--seed", type=int, default=0, help="Seed for the generated fixtures.")
+    resolution.add_argument("--ocr", action="store_true", help="Also OCR both variants and compare their accuracy.")
+    resolution.set_defaults(func=bench_resolution)
+
+    startup = subparsers.add_parser("startup", help="Time the cold start of the window and of the first page.")
+    startup.add_argument("--repeat", type=int, default=3,
+                         help="Fresh interpreters per measure; the median is reported.")
+    startup.add_argument("--seed", type=int, default=0, help="Seed for the fixture PDFs.")
+    startup.add_argument("--ocr", action="store_true", help="Also time the first page of a scanned document.")
+    startup.add_argument("--max-window-s", type=float, default=2.0, help="Target time to the window.")
+    startup.add_argument("--max-first-page-s", type=float, default=3.0,
+                         help="Target time to the first text-layer page.")
+    startup.set_defaults(func=bench_startup)
+
+    memory = subparsers.add_parser("memory", help="Compare memory allocated per page before and after PageBuffer.")
+    memory.add_argument("pdf", nargs="?", help="PDF to use instead of the generated scanned fixtures.")
+    memory.add_argument("--pages", type=int, default=5, help="Pages per document.")
+    memory.add_argument("--seed", type=int, default=0, help="Seed for the fixture PDFs.")
+    memory.set_defaults(func=bench_memory)
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    sys.exit(args.func(args))
@@ -0,0 +1,199 @@
+"""Headless batch extraction: run main() over many PDFs without the Tk window.
+
+Usage:
+    python cli.py scans/ more/*.pdf single.pdf -o out/ --workers 4 --hybrid
+"""
+import argparse
+import glob
+import logging
+import multiprocessing
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from full_implementation_1 import (DEFAULT_BATCH_SIZE, DEFAULT_BATCH_WINDOW, PREPROCESS_MODES, PREPROCESS_PROFILES,
+                                  RESOLUTION_POLICIES, TEXT_LAYOUTS, get_output_path, main)
+from metrics import PROFILERS
+from page_writer import OUTPUT_FORMATS, get_format_path
+from result_cache import DEFAULT_CACHE_PATH, ResultCache
+
+LOG_FORMAT = '%(asctime)s - %(processName)s - %(levelname)s - %(message)s'
+
+
+class ProgressReporter:
+    """Receives the ('progress', percent) and ('progress_label', text) messages main() sends.
+
+    Anything with a put(message) method can be passed to main() as its queue. The Tk UI passes a
+    queue.Queue; headless callers pass a reporter instead.
+    """
+
+    def put(self, message):
+        pass
+
+
+class LogReporter(ProgressReporter):
+    """Logs the progress label of a document every time it moves on by at least `step` percent."""
+
+    def __init__(self, logger, name: str, step: float = 10.0):
+        self.logger = logger
+        self.name = name
+        self.step = step
+        self._percent = 0.0
+        self._last = -step
+
+    def put(self, message):
+        if message[0] == 'progress':
+            self._percent = message[1]
+        elif message[0] == 'progress_label' and self._percent - self._last >= self.step:
+            self._last = self._percent
+            self.logger.info(f"{self.name}: {message[1]}")
+
+
+def find_pdfs(inputs, recursive: bool = False):
+    """Expands files, directories and glob patterns into a sorted list of PDF paths."""
+    found = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            pattern = os.path.join(item, "**", "*.pdf") if recursive else os.path.join(item, "*.pdf")
+            found.update(glob.glob(pattern, recursive=recursive))
+        elif os.path.isfile(item):
+            found.add(item)
+        else:
+            found.update(glob.glob(item, recursive=True))
+    return sorted(os.path.abspath(path) for path in found if path.lower().endswith(".pdf"))
+
+
+def is_up_to_date(pdf_file: str, output_dir: str, output_formats=("txt",)) -> bool:
+    output_path = get_output_path(pdf_file, output_dir)
+    paths = [get_format_path(output_path, output_format) for output_format in output_formats]
+    return all(os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(pdf_file) for path in paths)
+
+
+def _init_worker(log_level: int):
+    logging.basicConfig(level=log_level, format=LOG_FORMAT)
+
+
+def process_file(pdf_file: str, output_dir: str, options: dict) -> dict:
+    """Runs main() on one PDF and returns a result record for the summary."""
+    logger = logging.getLogger('PDFProcessor')
+    name = os.path.basename(pdf_file)
+    start = time.perf_counter()
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        result = main(pdf_file, output_dir, logger, LogReporter(logger, name), **options)
+        error = None if result["output_path"] else "no text was extracted"
+        pages, blank_pages = result["pages"], result["blank_pages"]
+    except Exception:
+        error = traceback.format_exc()
+        pages = blank_pages = 0
+    return {"file": pdf_file, "pages": pages, "blank_pages": blank_pages, "seconds": time.perf_counter() - start,
+            "error": error}
+
+
+def run_batch(pdf_files, output_dir, options: dict, workers: int, logger, log_level: int = logging.INFO):
+    """Processes the given PDFs, several at a time when workers > 1, and returns their result records."""
+    jobs = [(pdf_file, output_dir or os.path.dirname(pdf_file)) for pdf_file in pdf_files]
+    if workers <= 1:
+        return [process_file(pdf_file, out_dir, options) for pdf_file, out_dir in jobs]
+
+    results = []
+    # Spawn rather than fork: torch does not survive being forked after initialisation
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=context, initializer=_init_worker,
+                             initargs=(log_level,)) as pool:
+        futures = [pool.submit(process_file, pdf_file, out_dir, options) for pdf_file, out_dir in jobs]
+        for done, future in enumerate(as_completed(futures), 1):
+            result = future.result()
+            status = "failed" if result["error"] else f"{result['pages']} page(s) in {result['seconds']:.1f}s"
+            logger.info(f"[{done}/{len(jobs)}] {os.path.basename(result['file'])}: {status}")
+            results.append(result)
+    return results
+
+
+def print_summary(results, skipped: int, elapsed: float):
+    failures = [result for result in results if result["error"]]
+    pages = sum(result["pages"] for result in results)
+    done = len(results) - len(failures)
+    print(f"\nDocuments: {done} extracted, {skipped} up to date, {len(failures)} failed")
+    print(f"Pages:     {pages} in {elapsed:.1f}s, {sum(result['blank_pages'] for result in results)} blank "
+          f"and not OCRed")
+    if elapsed > 0:
+        print(f"Rate:      {pages / elapsed:.2f} pages/s, {done / elapsed:.3f} docs/s")
+    for result in failures:
+        print(f"FAILED {result['file']}: {result['error'].strip().splitlines()[-1]}", file=sys.stderr)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Extract text from PDF files without the GUI.")
+    parser.add_argument("inputs", nargs="+", help="PDF files, directories or glob patterns.")
+    parser.add_argument("-o", "--output", help="Directory for the .txt files (default: next to each PDF).")
+    parser.add_argument("-r", "--recursive", action="store_true", help="Search directories recursively.")
+    parser.add_argument("-w", "--workers", type=int, default=1, help="Documents processed at the same time.")
+    parser.add_argument("--page-workers", type=int, default=1,
+                        help="OCR processes per document; only valid with --workers 1.")
+    parser.add_argument("--force", action="store_true", help="Process files whose output is already up to date.")
+    parser.add_argument("--basic", action="store_true", help="Use the text layer when the PDF has one.")
+    parser.add_argument("--hybrid", action="store_true", help="Decide between text layer and OCR page by page.")
+    parser.add_argument("--spellcheck", action="store_true", help="Correct spelling of the extracted text.")
+    parser.add_argument("--symspell", action="store_true", help="Use the SymSpell index for spelling correction.")
+    parser.add_argument("--spelling-cache", help="JSON file that keeps spelling corrections between runs.")
+    parser.add_argument("--preprocess", choices=PREPROCESS_MODES, default="off", help="Image preprocessing stage.")
+    parser.add_argument("--profile", choices=PREPROCESS_PROFILES, default="quality", help="Preprocessing profile.")
+    parser.add_argument("--format", nargs="+", choices=OUTPUT_FORMATS, default=["txt"], dest="formats",
+                        help="Output files to write; jsonl adds column and line boxes, confidences and timings.")
+    parser.add_argument("--resolution", choices=RESOLUTION_POLICIES, default="fixed",
+                        help="OCR every page at 200 DPI, or pick a DPI per region from its text height.")
+    parser.add_argument("--layout", choices=TEXT_LAYOUTS, default="plain", help="Text-layer output layout.")
+    parser.add_argument("--batch-window", type=int, default=DEFAULT_BATCH_WINDOW,
+                        help="Pages whose column crops are OCRed together in one batched call.")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE,
+                        help="Text boxes the recognizer processes per batch.")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the OCR result cache.")
+    parser.add_argument("--clear-cache", action="store_true", help="Empty the OCR result cache before starting.")
+    parser.add_argument("--cache-path", default=DEFAULT_CACHE_PATH, help="OCR result cache database.")
+    parser.add_argument("--resume", action="store_true", help="Continue interrupted jobs from their journals.")
+    parser.add_argument("--metrics", action="store_true",
+                        help="Save per-stage timings and memory use to <name>.metrics.json.")
+    parser.add_argument("--profiler", choices=PROFILERS, default="off",
+                        help="Also profile each document with cProfile or tracemalloc (implies --metrics).")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Only log warnings and errors.")
+    return parser
+
+
+def cli(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    log_level = logging.WARNING if args.quiet else logging.INFO
+    logging.basicConfig(level=log_level, format=LOG_FORMAT)
+    logger = logging.getLogger('PDFProcessor')
+
+    if args.workers > 1 and args.page_workers > 1:
+        logger.error("--page-workers can only be used with --workers 1.")
+        return 2
+    if args.clear_cache:
+        ResultCache(args.cache_path).clear()
+        logger.info(f"Cleared the result cache at {args.cache_path}")
+
+    pdf_files = find_pdfs(args.inputs, args.recursive)
+    pending = [pdf for pdf in pdf_files
+               if args.force or args.resume
+               or not is_up_to_date(pdf, args.output or os.path.dirname(pdf), args.formats)]
+    skipped = len(pdf_files) - len(pending)
+    logger.info(f"Found {len(pdf_files)} PDF(s), {skipped} already up to date.")
+
+    options = dict(basic=args.basic, spellcheck=args.spellcheck, workers=args.page_workers, preprocess=args.preprocess,
+                   preprocess_profile=args.profile, hybrid=args.hybrid, text_layout=args.layout,
+                   spelling_cache=args.spelling_cache, symspell=args.symspell, use_cache=not args.no_cache,
+                   cache_path=args.cache_path, resume=args.resume, batch_window=args.batch_window,
+                   batch_size=args.batch_size, output_formats=tuple(args.formats),
+                   metrics_report=args.metrics or args.profiler != "off", profiler=args.profiler,
+                   resolution=args.resolution)
+    start = time.perf_counter()
+    results = run_batch(pending, args.output, options, args.workers, logger, log_level) if pending else []
+    print_summary(results, skipped, time.perf_counter() - start)
+    return 1 if any(result["error"] for result in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(cli())
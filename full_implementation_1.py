@@ -1,220 +1,886 @@
-import cv2
 import numpy as np
-from pdf2image import convert_from_path
-from PIL import Image, ImageEnhance
-import easyocr
-import PyPDF2
-from docx import Document
+from PIL import Image
 import os
 from typing import List
-import fitz  # PyMuPDF for checking if PDF has text layer
+import fitz  # PyMuPDF for checking the text layer and rendering pages
 import json
 from datetime import datetime
-from textblob import TextBlob
+from result_cache import DEFAULT_CACHE_PATH, ResultCache, hash_file, ocr_model_version
+from page_journal import PageJournal, get_journal_path
+from page_writer import get_format_path, open_page_writers
+from page_buffer import PageBuffer, as_page_buffer
+from metrics import StageMetrics, active_metrics, collecting, profiling, shared_stage, stage
 import logging
 import traceback 
+import multiprocessing
+import threading
+import time
+import gc
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-def preprocess_image(image, logger):
-    """Preprocessing to enhance text clarity and make it thinner for OCR."""
+# cv2, easyocr (which pulls in torch) and TextBlob are imported by the functions that need them, so
+# starting the app or extracting a document that only has a text layer never loads them.
+
+DEFAULT_DPI = 200  # Same resolution pdf2image's convert_from_path used to render at
+
+def render_page(page, dpi: int = DEFAULT_DPI, clip=None) -> Image.Image:
+    """Renders a single PyMuPDF page, or the clip rectangle of it, to an RGB PIL image."""
+    pixmap = page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False, clip=clip)
+    return Image.frombytes("RGB", (pixmap.width, pixmap.height), pixmap.samples)
+
+def render_page_buffer(page, dpi: int = DEFAULT_DPI, clip=None, shared: bool = False) -> PageBuffer:
+    """Renders a PyMuPDF page, or the clip rectangle of it, straight into a PageBuffer without copying the pixels."""
+    return PageBuffer.from_pixmap(page.get_pixmap(dpi=dpi, colorspace=fitz.csRGB, alpha=False, clip=clip), shared)
+
+def iter_pdf_pages(pdf_path: str, logger, dpi: int = DEFAULT_DPI, page_indices=None):
+    """Yields (page_index, image) one page at a time so only the current page is kept in memory."""
+    doc = fitz.open(pdf_path)
+    try:
+        for i in (range(doc.page_count) if page_indices is None else page_indices):
+            logger.info(f"Rendering page {i + 1}/{doc.page_count} at {dpi} DPI.")
+            with stage("render", i):
+                image = render_page(doc[i], dpi)
+            yield i, image
+    finally:
+        doc.close()
+
+# Loaded EasyOCR readers, keyed by language list and reader settings
+_reader_cache = {}
+_reader_cache_lock = threading.Lock()
+
+def get_reader(logger, languages=('en',), **settings):
+    """Returns the process-wide EasyOCR reader for these settings, loading the model on first use."""
+    key = (tuple(languages), tuple(sorted(settings.items())))
+    # Held while loading so concurrent callers wait for one model load instead of starting their own
+    with _reader_cache_lock:
+        reader = _reader_cache.get(key)
+        if reader is None:
+            logger.info(f"Loading OCR model for languages: {', '.join(languages)}")
+            import easyocr
+            reader = easyocr.Reader(list(languages), **settings)
+            _reader_cache[key] = reader
+    return reader
+
+def warm_up_reader(logger, languages=('en',), **settings):
+    """Loads the OCR model ahead of time so the first job does not pay for it."""
+    try:
+        get_reader(logger, languages, **settings)
+        logger.info("OCR model is loaded and ready.")
+    except Exception:
+        # Not fatal: the first OCR job will try to load the model again
+        logger.error(f"Could not warm up OCR model: {traceback.format_exc()}")
+
+def release_readers(logger):
+    """Drops every cached reader and frees the memory held by their models."""
+    with _reader_cache_lock:
+        count = len(_reader_cache)
+        _reader_cache.clear()
+    gc.collect()
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.cuda.is_available():
+        torch.cuda.empty_cache()
+    logger.info(f"Released {count} cached OCR model(s).")
+
+def get_page_count(pdf_path: str) -> int:
+    with fitz.open(pdf_path) as doc:
+        return doc.page_count
+
+# A page is OCRed when its text layer is shorter than this and images cover most of it
+MIN_TEXT_LAYER_CHARS = 50
+SCANNED_IMAGE_COVERAGE = 0.5
+
+def get_image_coverage(page) -> float:
+    """Fraction of the page area covered by images, from PyMuPDF's image placement info."""
+    page_area = abs(page.rect)
+    if not page_area:
+        return 0.0
+    covered = sum(abs(fitz.Rect(info["bbox"]) & page.rect) for info in page.get_image_info())
+    return min(1.0, covered / page_area)
+
+# plain: MuPDF's default text order, blocks: text blocks sorted top-to-bottom, left-to-right
+TEXT_LAYOUTS = ("plain", "blocks")
+
+def get_page_text(page, text_layout: str = "plain") -> str:
+    """Returns the text layer of a PyMuPDF page."""
+    if text_layout == "blocks":
+        # Block tuples are (x0, y0, x1, y1, text, block_no, block_type); type 1 is an image block
+        blocks = page.get_text("blocks", sort=True)
+        return "\n\n".join(block[4].strip() for block in blocks if block[6] == 0 and block[4].strip())
+    return page.get_text()
+
+def read_text_layer(pdf_path: str, logger, text_layout: str = "plain") -> List[str]:
+    """Returns the text layer of every page, empty for pages without one, opening and parsing the PDF only once."""
+    if text_layout not in TEXT_LAYOUTS:
+        raise ValueError(f"Unknown text layout: {text_layout}")
+    with stage("text_layer"), fitz.open(pdf_path) as doc:
+        return [get_page_text(page, text_layout) for page in doc]
+
+def route_pages(pdf_path: str, logger, text_layout: str = "plain"):
+    """Splits a PDF into pages with a usable text layer and pages that need OCR.
+
+    Returns ({page_index: text} for text-layer pages, [page_index, ...] for pages to OCR).
+    """
+    page_texts = {}
+    ocr_indices = []
+    with stage("text_layer"), fitz.open(pdf_path) as doc:
+        for i, page in enumerate(doc):
+            text = get_page_text(page, text_layout)
+            text_chars = len(text.strip())
+            if text_chars == 0 or (text_chars < MIN_TEXT_LAYER_CHARS
+                                   and get_image_coverage(page) >= SCANNED_IMAGE_COVERAGE):
+                ocr_indices.append(i)
+            else:
+                page_texts[i] = text
+    logger.info(f"{len(page_texts)} page(s) have a text layer, {len(ocr_indices)} page(s) need OCR.")
+    return page_texts, ocr_indices
+
+PREPROCESS_PROFILES = ("quality", "fast")
+# off: skip preprocessing, ocr: OCR the preprocessed page, debug: OCR the original and save the preprocessed page
+PREPROCESS_MODES = ("off", "ocr", "debug")
+
+def _to_gray(image) -> np.ndarray:
+    if isinstance(image, PageBuffer):
+        return image.gray
+    import cv2
+    page = np.asarray(image)
+    return page if page.ndim == 2 else cv2.cvtColor(page, cv2.COLOR_RGB2GRAY)
+
+def _contrast_lut(gray: np.ndarray, factor: float) -> np.ndarray:
+    """Lookup table that reproduces PIL's ImageEnhance.Contrast(image).enhance(factor) on a grayscale image."""
+    import cv2
+    mean = np.float32(int(cv2.mean(gray)[0] + 0.5))
+    lut = mean + np.float32(factor) * (np.arange(256, dtype=np.float32) - mean)
+    return np.clip(lut, 0, 255).astype(np.uint8)
+
+def preprocess_image(image, logger, profile: str = "quality") -> np.ndarray:
+    """Preprocessing to enhance text clarity and make it thinner for OCR.
+
+    Works on NumPy arrays throughout and returns the binarized page as a 2D uint8 array. The "quality"
+    profile gives the same pixels as the original PIL-based pipeline; "fast" replaces the non-local
+    means denoiser with a median filter, which is far cheaper on high-DPI scans.
+    """
+    if profile not in PREPROCESS_PROFILES:
+        raise ValueError(f"Unknown preprocessing profile: {profile}")
+
+    import cv2
     logger.info("Starting image preprocessing.")
-    gray = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
-    denoised = cv2.fastNlMeansDenoising(gray, None, h=10, templateWindowSize=7, searchWindowSize=21)
-    pil_img = Image.fromarray(denoised)
-    enhancer = ImageEnhance.Contrast(pil_img)
-    high_contrast = enhancer.enhance(2.5)
-    high_contrast = np.array(high_contrast)
+    gray = _to_gray(image)
+    if profile == "fast":
+        denoised = cv2.medianBlur(gray, 3)
+    else:
+        denoised = cv2.fastNlMeansDenoising(gray, None, h=10, templateWindowSize=7, searchWindowSize=21)
+    high_contrast = cv2.LUT(denoised, _contrast_lut(denoised, 2.5))
     binarized = cv2.adaptiveThreshold(high_contrast, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 15, 10)
-    kernel = np.ones((1, 1), np.uint8)
-    eroded = cv2.erode(binarized, kernel, iterations=50)
-    blurred = cv2.GaussianBlur(eroded, (5, 5), 0)
-    sharpened = cv2.addWeighted(eroded, 1.5, blurred, -0.5, 0)
-    
+    blurred = cv2.GaussianBlur(binarized, (5, 5), 0)
+    sharpened = cv2.addWeighted(binarized, 1.5, blurred, -0.5, 0)
+
     logger.info("Image preprocessing completed.")
-    return Image.fromarray(sharpened)
+    return sharpened
 
-def detect_columns(image, logger, headline_height_ratio=0.25, gap_threshold=100):
-    """Detects at most two columns in an image while ignoring the headline and removing padding."""
-    logger.info("Processing image for column detection.")
+# Part of the result cache key, bump when detect_columns or the cropping of its regions changes
+COLUMN_DETECTOR = "projection-v4"
+
+def _runs(mask: np.ndarray) -> np.ndarray:
+    """Returns an (n, 2) array of [start, end) index pairs for each run of True values in a 1D mask."""
+    edges = np.diff(np.concatenate(([0], mask.astype(np.int8), [0])))
+    return np.column_stack((np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)))
+
+def find_column_boxes(gray: np.ndarray, headline_height_ratio=0.25, analysis_width=600, min_gutter_ratio=0.015,
+                      min_column_ratio=0.1, gutter_ink_ratio=0.02, max_rule_width=3, headline_gutter_cover=0.5):
+    """Finds text regions in reading order from vertical whitespace projection profiles.
+
+    The profile is computed on a copy of the page downscaled to analysis_width, and the resulting
+    boxes are mapped back to full-resolution (left, top, right, bottom) coordinates. Gutters are runs
+    of nearly empty columns; a thin printed rule with whitespace on both sides also counts as a gutter.
+    Any number of columns is supported. A headline crossing the gutters near the top of the page is
+    returned as its own full-width region ahead of the columns: a band of text rows counts as headline
+    when its ink covers at least headline_gutter_cover of a gutter's width, and the headline ends at the
+    first band below it that does not.
+    """
+    height, width = gray.shape
+    scale = min(1.0, analysis_width / width)
+    if scale < 1.0:
+        import cv2
+        gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                          interpolation=cv2.INTER_AREA)
+    ink = gray < 200
+
+    # Padding removal: content bounds from every row
+    content_cols = np.flatnonzero(ink.any(axis=0))
+    if len(content_cols) == 0:
+        return []
+    left, right = content_cols[0], content_cols[-1] + 1
+    content_width = right - left
+
+    # Profile of the body, below where a headline may sit
+    top = int(ink.shape[0] * headline_height_ratio)
+    body = ink[top:, left:right]
+    profile = body.sum(axis=0)
+    gutter = profile <= gutter_ink_ratio * body.shape[0]
+    for start, end in _runs(~gutter):
+        # A narrow, mostly solid run of ink between two gaps is a printed column rule
+        if end - start <= max_rule_width and start > 0 and end < content_width \
+                and profile[start:end].max() >= 0.5 * body.shape[0]:
+            gutter[start:end] = True
 
-    # Step 1: Convert image to grayscale & find non-white areas for padding removal
-    gray = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2GRAY)
-    _, binary = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)
+    # Interior gutters that are wide enough; runs touching the content edges are margins
+    gutters = [(start, end) for start, end in _runs(gutter)
+               if start > 0 and end < content_width and end - start >= min_gutter_ratio * content_width]
 
-    # Find content bounds (left & right)
-    cols = np.where(np.sum(binary, axis=0) > 0)[0]
-    if len(cols) == 0:
+    columns = []
+    col_start = 0
+    for start, end in gutters + [(content_width, content_width)]:
+        if start - col_start >= min_column_ratio * content_width:
+            columns.append((col_start, start))
+            col_start = end
+    # Gutters next to a rejected sliver are dropped, so the sliver stays with its neighbour
+    if columns:
+        columns[-1] = (columns[-1][0], content_width)
+
+    body_top = 0
+    if len(columns) > 1:
+        # Coverage rather than any ink, so rules and column lines reaching into a gutter do not pass for a headline
+        between = [(prev_end, next_start) for (_, prev_end), (next_start, _) in zip(columns, columns[1:])]
+        top_ink = ink[:top, left:right]
+        for band_start, band_end in _runs(top_ink.any(axis=1)):
+            band = top_ink[band_start:band_end]
+            if any(band[:, start:end].any(axis=0).mean() >= headline_gutter_cover for start, end in between):
+                body_top = band_end
+            elif body_top:
+                break
+
+    def to_full(x0, y0, x1, y1):
+        return (int((left + x0) / scale), int(y0 / scale),
+                min(width, int(np.ceil((left + x1) / scale))), min(height, int(np.ceil(y1 / scale))))
+
+    # Lines above the body profile may reach further into a gutter; columns take the ink that touches them,
+    # up to the middle of the gutter
+    column_ink = ink[body_top:, left:right].any(axis=0)
+    edges = [list(column) for column in columns]
+    for (_, gutter_start), (gutter_end, _), edge, next_edge in zip(columns, columns[1:], edges, edges[1:]):
+        middle = (gutter_start + gutter_end) // 2
+        blank = np.flatnonzero(~column_ink[gutter_start:middle])
+        edge[1] = gutter_start + blank[0] if len(blank) else middle
+        blank = np.flatnonzero(~column_ink[middle:gutter_end][::-1])
+        next_edge[0] = gutter_end - blank[0] if len(blank) else middle
+
+    small_height = ink.shape[0]
+    boxes = []
+    if body_top:
+        boxes.append(to_full(0, 0, content_width, body_top))
+    boxes.extend(to_full(x0, body_top, x1, small_height) for x0, x1 in edges)
+    return boxes
+
+def get_column_boxes(image, logger, headline_height_ratio=0.25) -> List[tuple]:
+    """Returns the (left, top, right, bottom) boxes detect_columns crops, or the whole page if it has no content."""
+    logger.info("Processing image for column detection.")
+    boxes = find_column_boxes(_to_gray(image), headline_height_ratio)
+    if not boxes:
         logger.info("No content detected, returning original image.")
+        return [(0, 0, image.width, image.height)]
+    logger.info(f"Detected {len(boxes)} text region(s): {boxes}")
+    return boxes
+
+def detect_columns(image, logger, headline_height_ratio=0.25):
+    """Splits a page into its headline and any number of columns, with the page padding removed."""
+    boxes = get_column_boxes(image, logger, headline_height_ratio)
+    if boxes == [(0, 0, image.width, image.height)]:
         return [image]
+    return [image.crop(box) for box in boxes]
 
-    left, right = cols[0], cols[-1]
+DEFAULT_BATCH_WINDOW = 4
+DEFAULT_BATCH_SIZE = 16
+# Region sizes are rounded up to this many pixels so crops of similar size share a detector batch
+BATCH_PAD_MULTIPLE = 64
 
-    # Ensure valid crop coordinates
-    if right <= left:
-        logger.warning(f"Invalid crop dimensions: left={left}, right={right}. Returning original image.")
-        return [image]
+# Ink is anything darker than this, as in column detection
+INK_THRESHOLD = 200
+# Connected ink smaller than this (pixels at 100 DPI) is scan noise rather than part of a glyph
+MIN_GLYPH_AREA = 6
+MIN_GLYPH_HEIGHT = 3
+# Pages with fewer glyphs are blank or separator sheets and are not OCRed
+MIN_PAGE_GLYPHS = 4
+# ...unless this much of the page is ink: white-on-black text and dark full-bleed pages form few components
+MAX_BLANK_INK_RATIO = 0.1
+# Margin kept around the glyphs of a region, in pixels at 100 DPI
+GLYPH_MARGIN = 3
 
-    image = image.crop((left, 0, right, image.height))
-    logger.info(f"Padding removed: Cropped width from {left} to {right}")
+def find_glyphs(gray: np.ndarray, dpi: int = DEFAULT_DPI) -> np.ndarray:
+    """Returns an (n, 4) array with the (left, top, right, bottom) box of every blob of ink big enough to be a glyph."""
+    import cv2
+    scale = dpi / 100
+    ink = (gray < INK_THRESHOLD).astype(np.uint8)
+    _, _, stats, _ = cv2.connectedComponentsWithStats(ink, connectivity=8)
+    stats = stats[1:]
+    glyphs = stats[(stats[:, cv2.CC_STAT_AREA] >= MIN_GLYPH_AREA * scale * scale)
+                   & (stats[:, cv2.CC_STAT_HEIGHT] >= MIN_GLYPH_HEIGHT * scale)]
+    left, top = glyphs[:, cv2.CC_STAT_LEFT], glyphs[:, cv2.CC_STAT_TOP]
+    return np.column_stack((left, top, left + glyphs[:, cv2.CC_STAT_WIDTH], top + glyphs[:, cv2.CC_STAT_HEIGHT]))
 
-    width, height = image.size
-    headline_height = int(height * headline_height_ratio)
+def is_blank_page(gray: np.ndarray, glyphs: np.ndarray) -> bool:
+    """True if a page with these glyphs has next to nothing on it: too few glyphs and little ink overall."""
+    return len(glyphs) < MIN_PAGE_GLYPHS and np.count_nonzero(gray < INK_THRESHOLD) < MAX_BLANK_INK_RATIO * gray.size
 
-    # Step 2: Detect edges in content area (ignoring headline)
-    content_area = image.crop((0, headline_height, width, height))
-    gray = cv2.cvtColor(np.array(content_area), cv2.COLOR_RGB2GRAY)
-    edges = cv2.Canny(gray, 50, 150, apertureSize=3)
+def crop_to_glyphs(box: tuple, glyphs: np.ndarray, dpi: int = DEFAULT_DPI):
+    """Shrinks box to the glyphs whose centre lies in it plus a margin, or returns None if it holds none."""
+    left, top, right, bottom = box
+    centre_x = (glyphs[:, 0] + glyphs[:, 2]) / 2
+    centre_y = (glyphs[:, 1] + glyphs[:, 3]) / 2
+    inside = glyphs[(centre_x >= left) & (centre_x < right) & (centre_y >= top) & (centre_y < bottom)]
+    if not len(inside):
+        return None
+    margin = int(round(GLYPH_MARGIN * dpi / 100))
+    return (max(left, int(inside[:, 0].min()) - margin), max(top, int(inside[:, 1].min()) - margin),
+            min(right, int(inside[:, 2].max()) + margin), min(bottom, int(inside[:, 3].max()) + margin))
 
-    # Step 3: Detect vertical lines
-    lines = cv2.HoughLinesP(edges, 1, np.pi / 180, threshold=120, minLineLength=100, maxLineGap=10)
+def _page_name(page_index: int) -> str:
+    return "Page" if page_index is None else f"Page {page_index + 1}"
 
-    if lines is None:
-        logger.info("No columns detected, assuming single column layout.")
-        return [image]
+def prepare_page(image, logger, preprocess: str = "off", preprocess_profile: str = "quality",
+                 debug_image_path: str = None, page_index: int = None) -> List[tuple]:
+    """Runs preprocessing and column detection on one rendered page.
 
-    column_positions = []
+    Returns [(box, region array, scale), ...] for the regions to OCR, in reading order, each cropped
+    to the glyphs inside it. Blank pages and regions without glyphs are left out, so a blank page
+    returns []. Scale maps region pixels to DEFAULT_DPI page pixels and is always 1 here, see
+    prepare_page_adaptive.
 
-    # Step 4: Extract vertical line positions
-    for line in lines:
-        x1, _, x2, _ = line[0]
-        column_positions.append(min(x1, x2))  # Store the leftmost x position
+    image is best passed as a PageBuffer: every stage then shares its grayscale plane and the regions
+    are views of it. Other images are converted to one once.
+    """
+    image = as_page_buffer(image)
+    with stage("blank_check", page_index):
+        glyphs = find_glyphs(image.gray)
+        blank = is_blank_page(image.gray, glyphs)
+    if blank:
+        logger.info(f"{_page_name(page_index)} is blank, skipping OCR.")
+        return []
 
-    if not column_positions:
-        logger.info("No significant column dividers found.")
-        return [image]
+    if preprocess != "off":
+        with stage("preprocess", page_index):
+            processed_image = preprocess_image(image, logger, preprocess_profile)
+        if preprocess == "debug":
+            # Written straight away so preprocessed pages never pile up in memory
+            Image.fromarray(processed_image).save(debug_image_path)
+        else:
+            image = PageBuffer(processed_image)
 
-    # Step 5: Find the best column divider with the largest gap
-    column_positions.sort()
-    max_gap = 0
-    best_divider = None
-    prev_x = 0  # Start from the left margin
-
-    for x in column_positions:
-        gap = x - prev_x
-        if gap > max_gap:
-            max_gap = gap
-            best_divider = x
-        prev_x = x
-
-    if best_divider is None or max_gap < gap_threshold:
-        logger.info(f"No valid column dividers found with gap > {gap_threshold}. Returning single column.")
-        return [image]
+    with stage("columns", page_index):
+        boxes = get_column_boxes(image, logger)
+    text_boxes = [text_box for text_box in (crop_to_glyphs(box, glyphs) for box in boxes) if text_box]
+    if len(text_boxes) < len(boxes):
+        logger.info(f"{_page_name(page_index)}: skipped {len(boxes) - len(text_boxes)} empty region(s).")
+    return [(box, image.region(box), 1.0) for box in text_boxes]
 
-    # Ensure best_divider is within valid bounds
-    if best_divider <= 0 or best_divider >= width - 10:
-        logger.warning(f"Invalid column divider position: {best_divider}. Returning single column.")
-        return [image]
+# fixed: OCR whole pages rendered at DEFAULT_DPI, adaptive: find the layout on a low-DPI render and
+# render each region again at a DPI picked from the height of its text
+RESOLUTION_POLICIES = ("fixed", "adaptive")
+ANALYSIS_DPI = 100
+MIN_OCR_DPI = 100
+MAX_OCR_DPI = 300
+# Height in pixels that the ink of a text line is rendered at for OCR
+TARGET_TEXT_HEIGHT = 24
+# Stands in for the DPI in the result cache key, bump when the adaptive policy changes its output
+ADAPTIVE_RESOLUTION = "adaptive-v1"
 
-    # Step 6: Split columns while keeping the headline intact
-    left_column = image.crop((0, 0, best_divider, height))
-    right_column = image.crop((min(best_divider + 10, width), 0, width, height))
+def _text_rows(gray: np.ndarray) -> np.ndarray:
+    """Rows with enough ink to be part of a text line; isolated specks of scan noise are ignored."""
+    ink = gray < 200
+    return ink.sum(axis=1) >= max(1, int(0.005 * gray.shape[1]))
 
-    return [left_column, right_column]
+def estimate_text_height(gray: np.ndarray):
+    """Median height in pixels of the text lines in a grayscale region, or None if it has no text."""
+    heights = [end - start for start, end in _runs(_text_rows(gray)) if end - start >= 2]
+    return float(np.median(heights)) if heights else None
 
-def correct_spelling(text: str, logger) -> str:
-    """Corrects spelling errors in a given text using TextBlob."""
-    logger.info("Correcting spelling...")
-    corrected_text = str(TextBlob(text).correct())
-    return corrected_text
+def choose_ocr_dpi(gray: np.ndarray, dpi: int = ANALYSIS_DPI) -> int:
+    """DPI at which the text of a region rendered at `dpi` reaches TARGET_TEXT_HEIGHT."""
+    height = estimate_text_height(gray)
+    if height is None:
+        return MIN_OCR_DPI
+    return int(np.clip(round(TARGET_TEXT_HEIGHT * dpi / height), MIN_OCR_DPI, MAX_OCR_DPI))
+
+def prepare_page_adaptive(page, logger, preprocess: str = "off", preprocess_profile: str = "quality",
+                          debug_image_path: str = None, page_index: int = None) -> List[tuple]:
+    """Finds the layout of a PyMuPDF page on a low-DPI render, then renders each region again for OCR.
+
+    Each region is cropped to its glyphs and rendered at the DPI choose_ocr_dpi picks for it, so
+    large print is not OCRed at more pixels than it needs and small print gets more. Returns the same
+    [(box, region array, scale), ...] as prepare_page, with boxes in DEFAULT_DPI page pixels.
+    """
+    with stage("render", page_index):
+        analysis = render_page_buffer(page, ANALYSIS_DPI)
+    gray = analysis.gray
+    with stage("blank_check", page_index):
+        glyphs = find_glyphs(gray, ANALYSIS_DPI)
+        blank = is_blank_page(gray, glyphs)
+    if blank:
+        logger.info(f"Page {page.number + 1} is blank, skipping OCR.")
+        return []
+    with stage("columns", page_index):
+        boxes = get_column_boxes(analysis, logger)
+    # get_pixmap clips in the same (rotated) page space the analysis render shows, so scaling is enough
+    to_page = fitz.Matrix(72 / ANALYSIS_DPI, 72 / ANALYSIS_DPI)
+
+    text_boxes = [text_box for text_box in (crop_to_glyphs(box, glyphs, ANALYSIS_DPI) for box in boxes) if text_box]
+    if len(text_boxes) < len(boxes):
+        logger.info(f"Page {page.number + 1}: skipped {len(boxes) - len(text_boxes)} empty region(s).")
+
+    regions = []
+    for n, (left, top, right, bottom) in enumerate(text_boxes):
+        dpi = choose_ocr_dpi(gray[top:bottom, left:right])
+        with stage("render", page_index):
+            region = render_page_buffer(page, dpi, fitz.Rect(left, top, right, bottom) * to_page)
+        logger.info(f"Region {n + 1} of page {page.number + 1}: OCR at {dpi} DPI.")
+        if preprocess != "off":
+            with stage("preprocess", page_index):
+                processed = preprocess_image(region, logger, preprocess_profile)
+            if preprocess == "debug":
+                Image.fromarray(processed).save(debug_image_path.replace(".png", f"_region{n + 1}.png"))
+            else:
+                region = processed
+        page_box = tuple(int(round(v * DEFAULT_DPI / ANALYSIS_DPI)) for v in (left, top, right, bottom))
+        regions.append((page_box, np.asarray(region), DEFAULT_DPI / dpi))
+    return regions
+
+def prepare_pdf_page(page, logger, resolution: str = "fixed", preprocess: str = "off",
+                     preprocess_profile: str = "quality", debug_image_path: str = None,
+                     page_index: int = None) -> List[tuple]:
+    """Renders a PyMuPDF page under the given resolution policy and returns its regions to OCR."""
+    if resolution == "adaptive":
+        return prepare_page_adaptive(page, logger, preprocess, preprocess_profile, debug_image_path, page_index)
+    logger.info(f"Rendering page {page.number + 1} at {DEFAULT_DPI} DPI.")
+    with stage("render", page_index):
+        image = render_page_buffer(page)
+    return prepare_page(image, logger, preprocess, preprocess_profile, debug_image_path, page_index)
+
+def _pad_region(region: np.ndarray, height: int, width: int) -> np.ndarray:
+    if region.shape[:2] == (height, width):
+        return region
+    import cv2
+    # Only the bottom and right edges grow, so box coordinates stay valid for the original crop
+    return cv2.copyMakeBorder(region, 0, height - region.shape[0], 0, width - region.shape[1],
+                              cv2.BORDER_CONSTANT, value=(255, 255, 255))
+
+def ocr_regions(regions: List[np.ndarray], reader, batch_size: int = DEFAULT_BATCH_SIZE) -> List[list]:
+    """OCRs many regions with readtext_batched and returns the readtext results of each region, in order.
+
+    readtext_batched needs every image of a call to have the same shape. Regions are grouped by their
+    size rounded up to BATCH_PAD_MULTIPLE and padded with white rather than resized, so detection runs
+    once per group and recognition handles batch_size text boxes at a time.
+    """
+    groups = {}
+    for index, region in enumerate(regions):
+        shape = tuple(-(-size // BATCH_PAD_MULTIPLE) * BATCH_PAD_MULTIPLE for size in region.shape[:2])
+        groups.setdefault(shape, []).append(index)
+
+    results = [None] * len(regions)
+    for (height, width), indices in groups.items():
+        batch = [_pad_region(regions[index], height, width) for index in indices]
+        for index, result in zip(indices, reader.readtext_batched(batch, batch_size=batch_size)):
+            results[index] = result
+    return results
+
+def join_page_text(region_results: List[list]) -> str:
+    return "\n".join(' '.join(text[1] for text in results) for results in region_results)
+
+def build_page_record(regions: List[tuple], region_results: List[list], seconds: float) -> dict:
+    """Page record for the output writers, with line boxes moved to DEFAULT_DPI page pixels.
+
+    A page without regions was found blank and gets source "blank".
+    """
+    columns = []
+    for column, (((left, top, right, bottom), _, scale), results) in enumerate(zip(regions, region_results)):
+        lines = [{"text": text,
+                  "box": [[int(round(x * scale)) + left, int(round(y * scale)) + top] for x, y in line_box],
+                  "confidence": round(float(confidence), 4)} for line_box, text, confidence in results]
+        columns.append({"column": column, "box": [int(left), int(top), int(right), int(bottom)],
+                        "dpi": int(round(DEFAULT_DPI / scale)), "lines": lines})
+    return {"text": join_page_text(region_results), "source": "ocr" if regions else "blank",
+            "seconds": round(seconds, 3), "columns": columns}
+
+def _ocr_prepared_pages(prepared, reader, batch_size: int) -> dict:
+    """OCRs the regions of several [(page_index, regions, prepare seconds)] in one pass.
+
+    Returns {page_index: page record}. The time of the batched pass is shared out by region count.
+    """
+    start_time = time.perf_counter()
+    with shared_stage("ocr", {i: len(regions) for i, regions, _ in prepared}):
+        results = ocr_regions([region for _, regions, _ in prepared for _, region, _ in regions], reader,
+                              batch_size)
+    seconds_per_region = (time.perf_counter() - start_time) / max(1, len(results))
+    records = {}
+    start = 0
+    for i, regions, seconds in prepared:
+        page_results = results[start:start + len(regions)]
+        records[i] = build_page_record(regions, page_results, seconds + seconds_per_region * len(regions))
+        start += len(regions)
+    return records
+
+def ocr_page_window(pages, reader, logger, debug_dir: str = None, preprocess: str = "off",
+                    preprocess_profile: str = "quality", batch_size: int = DEFAULT_BATCH_SIZE,
+                    resolution: str = "fixed"):
+    """OCRs a window of (page_index, PyMuPDF page) pairs with one batched pass over all of their regions.
+
+    Returns ({page_index: page record}, {page_index: error}). If the batched pass fails, the pages
+    are retried one at a time so a single bad page does not take the rest of the window with it.
+    """
+    errors, prepared = {}, []
+    for i, page in pages:
+        start_time = time.perf_counter()
+        try:
+            regions = prepare_pdf_page(page, logger, resolution, preprocess, preprocess_profile,
+                                       get_debug_image_path(debug_dir, i), i)
+            prepared.append((i, regions, time.perf_counter() - start_time))
+        except Exception:
+            errors[i] = traceback.format_exc()
+
+    try:
+        return _ocr_prepared_pages(prepared, reader, batch_size), errors
+    except Exception:
+        if len(prepared) == 1:
+            errors[prepared[0][0]] = traceback.format_exc()
+            return {}, errors
+        logger.warning("Batched OCR of the page window failed, retrying its pages one at a time.")
+
+    records = {}
+    for page in prepared:
+        try:
+            records.update(_ocr_prepared_pages([page], reader, batch_size))
+        except Exception:
+            errors[page[0]] = traceback.format_exc()
+    return records, errors
+
+def get_debug_image_path(debug_dir: str, page_index: int):
+    return os.path.join(debug_dir, f"page_{page_index + 1:04d}.png") if debug_dir else None
+
+def get_windows(page_indices: List[int], batch_window: int) -> List[List[int]]:
+    batch_window = max(1, batch_window)
+    return [page_indices[start:start + batch_window] for start in range(0, len(page_indices), batch_window)]
+
+# State owned by each OCR worker process, built once by _init_ocr_worker
+_worker_reader = None
+_worker_doc = None
+_worker_options = None
+
+def _init_ocr_worker(pdf_path: str, threads_per_worker: int, ocr_options: dict):
+    global _worker_reader, _worker_doc, _worker_options
+    import cv2
+    import torch
+
+    # Keep workers from oversubscribing the cores with their own thread pools
+    torch.set_num_threads(threads_per_worker)
+    cv2.setNumThreads(1)
+    _worker_reader = get_reader(logging.getLogger('PDFProcessor.worker'))
+    _worker_doc = fitz.open(pdf_path)
+    _worker_options = ocr_options
+
+def _ocr_window_worker(page_indices: List[int], debug_dir: str):
+    """Returns ({page_index: page record}, {page_index: error}, stage metric records) for one window of pages."""
+    logger = logging.getLogger('PDFProcessor.worker')
+    pages = [(i, _worker_doc[i]) for i in page_indices]
+    with collecting(StageMetrics()) as metrics:
+        records, errors = ocr_page_window(pages, _worker_reader, logger, debug_dir, **_worker_options)
+    return records, errors, metrics.records
+
+def report_progress(queue, done: int, total: int):
+    progress_percentage = done / total * 100
+    queue.put(('progress', progress_percentage))
+    queue.put(('progress_label', f"{progress_percentage:.2f}% ({done}/{total})"))
+
+def get_cache_settings(ocr_options: dict) -> dict:
+    """Everything besides the PDF itself that changes the OCR text of a page."""
+    # Debug mode OCRs the same original page as "off"
+    preprocess = "ocr" if ocr_options["preprocess"] == "ocr" else "off"
+    dpi = ADAPTIVE_RESOLUTION if ocr_options.get("resolution") == "adaptive" else DEFAULT_DPI
+    return {"dpi": dpi, "columns": COLUMN_DETECTOR, "model": ocr_model_version(), "preprocess": preprocess,
+            "preprocess_profile": ocr_options["preprocess_profile"] if preprocess == "ocr" else None}
+
+def lookup_cached_pages(cache: ResultCache, pdf_hash: str, page_indices: List[int], ocr_options: dict, logger,
+                        read: bool = True):
+    """Returns ({page_index: record} found in the cache, [page_index, ...] still to OCR, {page_index: cache key})."""
+    settings = get_cache_settings(ocr_options)
+    keys = {i: cache.page_key(pdf_hash, i, settings) for i in page_indices}
+    cached = cache.get_many(keys.values()) if read else {}
+    hits = {i: cached[key] for i, key in keys.items() if key in cached}
+    logger.info(f"{len(hits)} page(s) served from the result cache, {len(page_indices) - len(hits)} page(s) to OCR.")
+    return hits, [i for i in page_indices if i not in hits], keys
+
+def ocr_pages_serial(pdf_path: str, page_indices: List[int], logger, queue, ocr_options: dict,
+                     debug_dir: str = None, page_done=None, batch_window: int = DEFAULT_BATCH_WINDOW,
+                     page_failed=None) -> int:
+    """OCRs pages in this process, batch_window pages per OCR pass, and returns how many succeeded.
+
+    page_done(page_index, page record), if given, is called for each page as soon as its window is
+    finished, and page_failed(page_index) for each page that could not be OCRed. Nothing is kept
+    here, so memory does not grow with the page count.
+    """
+    succeeded = 0
+    reader = get_reader(logger)
+    done = 0
+
+    # Pages are rendered a window at a time, so peak memory grows with the window rather than the page count
+    with fitz.open(pdf_path) as doc:
+        for window in get_windows(page_indices, batch_window):
+            records, errors = ocr_page_window([(i, doc[i]) for i in window], reader, logger, debug_dir,
+                                              **ocr_options)
+            for i in window:
+                if i in errors:
+                    logger.error(f"Error processing page {i + 1}: {errors[i]}")
+                    if page_failed:
+                        page_failed(i)
+                else:
+                    succeeded += 1
+                    if page_done:
+                        page_done(i, records[i])
+            done += len(window)
+            report_progress(queue, done, len(page_indices))
+
+    return succeeded
+
+def ocr_pages_parallel(pdf_path: str, page_indices: List[int], workers: int, logger, queue, ocr_options: dict,
+                       debug_dir: str = None, page_done=None, batch_window: int = DEFAULT_BATCH_WINDOW,
+                       page_failed=None) -> int:
+    """OCRs windows of pages across a process pool, reporting pages like ocr_pages_serial."""
+    windows = get_windows(page_indices, batch_window)
+    workers = min(workers, len(windows))
+    threads_per_worker = max(1, (os.cpu_count() or 1) // workers)
+    logger.info(f"Starting {workers} OCR worker processes ({threads_per_worker} threads each).")
+    succeeded = 0
+    done = 0
+
+    # Spawn rather than fork: torch does not survive being forked after initialisation
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_ocr_worker,
+                             initargs=(pdf_path, threads_per_worker, ocr_options)) as pool:
+        futures = {pool.submit(_ocr_window_worker, window, debug_dir): window for window in windows}
+        for future in as_completed(futures):
+            records, errors, stage_records = future.result()
+            if active_metrics():
+                active_metrics().extend(stage_records)
+            for i in futures[future]:
+                if i in errors:
+                    logger.error(f"Error processing page {i + 1}: {errors[i]}")
+                    if page_failed:
+                        page_failed(i)
+                else:
+                    logger.info(f"Page {i + 1} finished.")
+                    succeeded += 1
+                    if page_done:
+                        page_done(i, records[i])
+            done += len(futures[future])
+            report_progress(queue, done, len(page_indices))
+
+    return succeeded
+
+def reused_record(record: dict, source: str) -> dict:
+    """A journaled or cached page record as written again; blank pages stay "blank" so they are still counted."""
+    return record if record.get("source") == "blank" else dict(record, source=source)
+
+def save_spelling_cache(corrector, logger):
+    """Saves the corrector's cache; a failed save only costs the next run its warm start."""
+    if corrector is None:
+        return
+    try:
+        corrector.save()
+    except OSError as e:
+        logger.warning(f"Could not save the spelling cache: {e}")
+
+def extract_text_from_pdf(pdf_path: str, output_path: str, logger, queue, basic: bool = False, spellcheck: bool = False,
+                          workers: int = 1, preprocess: str = "off", preprocess_profile: str = "quality",
+                          hybrid: bool = False, text_layout: str = "plain", spelling_cache: str = None,
+                          symspell: bool = False, use_cache: bool = True, cache_path: str = None,
+                          resume: bool = False, batch_window: int = DEFAULT_BATCH_WINDOW,
+                          batch_size: int = DEFAULT_BATCH_SIZE, writers=(), resolution: str = "fixed",
+                          page_sources=None) -> int:
+    """Extracts the pages of a PDF and hands each one to the writers as soon as it is finished.
+
+    Each written page is also sent to queue as a ('page', (page_index, record)) message, and counted
+    by its source ("text_layer", "ocr", "blank", "cache" or "journal") in the page_sources Counter.
+    Blank pages keep the source "blank" when they come from the cache or the journal.
+
+    Returns the number of pages written, 0 if the extraction failed.
+    """
+    pages_written = 0
 
-def extract_text_from_pdf(pdf_path: str, output_path: str, logger, queue, basic: bool = False, spellcheck: bool = False) -> List[str]:
-    extracted_text = []
-    preprocessed_images = []
-    
     try:
         logger.info(f"Processing PDF: {pdf_path}")
-        if basic:
-            doc = fitz.open(pdf_path)
-            has_text = any(page.get_text().strip() for page in doc)
-            doc.close()
-            
-            if has_text:
-                logger.info("PDF contains text layer, extracting text.")
-                with open(pdf_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    for page in pdf_reader.pages:
-                        text = page.extract_text()
-                        if text.strip():
-                            if spellcheck:
-                                extracted_text.append(correct_spelling(text, logger))
-                            else:
-                                extracted_text.append(text)
-                return extracted_text
+        # Spelling is corrected token by token, so correcting page by page gives the same text
+        corrector = None
+        if spellcheck:
+            from spell_corrector import get_spell_corrector
+            corrector = get_spell_corrector(spelling_cache, symspell)
+
+        def write_page(i, record):
+            nonlocal pages_written
+            if corrector:
+                with stage("spelling", i):
+                    record = dict(record, text=corrector.correct(record["text"]))
+            with stage("write", i):
+                for writer in writers:
+                    writer.write_page(i, record)
+            pages_written += 1
+            if page_sources is not None:
+                page_sources[record["source"]] += 1
+            queue.put(('page', (i, record)))
+
+        def skip_page(i):
+            for writer in writers:
+                writer.skip_page(i)
+
+        if basic and not hybrid:
+            page_texts = read_text_layer(pdf_path, logger, text_layout)
+            if any(text.strip() for text in page_texts):
+                logger.info("PDF contains text layer, extracted text from it.")
+                for i, text in enumerate(page_texts):
+                    if text.strip():
+                        write_page(i, {"text": text, "source": "text_layer"})
+                    else:
+                        skip_page(i)
+                save_spelling_cache(corrector, logger)
+                return pages_written
             else:
                 logger.info("No text layer found. Extracting text using OCR.")
 
-        images = convert_from_path(pdf_path)
-        # images = images[:5]  # Limit to 5 pages for processing
-        reader = easyocr.Reader(['en'])
-        total_rows = len(images)
-
-        for i, image in enumerate(images):
-            try:
-                processed_image = preprocess_image(image, logger)
-                preprocessed_images.append(processed_image)
-
-                # Detect columns and extract text from each
-                columns = detect_columns(image, logger)
-                page_text = []
-                
-                for column_img in columns:
-                    results = reader.readtext(np.array(column_img))
-                    column_text = ' '.join([text[1] for text in results])
-                    if spellcheck:
-                        page_text.append(correct_spelling(column_text, logger))
-                    else:
-                        page_text.append(column_text)
-                
-                extracted_text.append("\n".join(page_text))
-            except:
-                logger.error(f"Error processing page {i + 1}: {traceback.format_exc()}")
-
-            progress_percentage = (i + 1) / total_rows * 100
-            queue.put(('progress', progress_percentage))
-            queue.put(('progress_label', f"{progress_percentage:.2f}% ({i + 1}/{total_rows})"))
-
-        preprocessed_pdf_path = output_path.replace(".txt", "_preprocessed.pdf")
-        preprocessed_images[0].save(preprocessed_pdf_path, save_all=True, append_images=preprocessed_images[1:])
-        logger.info(f"Preprocessed images saved as PDF: {preprocessed_pdf_path}")
-        
+        if preprocess not in PREPROCESS_MODES:
+            raise ValueError(f"Unknown preprocessing mode: {preprocess}")
+        if resolution not in RESOLUTION_POLICIES:
+            raise ValueError(f"Unknown resolution policy: {resolution}")
+        ocr_options = dict(preprocess=preprocess, preprocess_profile=preprocess_profile, batch_size=batch_size,
+                           resolution=resolution)
+        debug_dir = None
+        if preprocess == "debug":
+            debug_dir = output_path.replace(".txt", "_preprocessed")
+            os.makedirs(debug_dir, exist_ok=True)
+            logger.info(f"Preprocessed pages will be saved to: {debug_dir}")
+
+        if hybrid:
+            # Only pages without a usable text layer are rasterized and OCRed
+            page_texts, ocr_indices = route_pages(pdf_path, logger, text_layout)
+        else:
+            page_texts, ocr_indices = {}, list(range(get_page_count(pdf_path)))
+
+        # Every finished page goes to the journal first, so nothing is lost if the job dies part way
+        pdf_hash = hash_file(pdf_path)
+        fingerprint = {"pdf": pdf_hash, "hybrid": hybrid, "text_layout": text_layout,
+                       "ocr": get_cache_settings(ocr_options)}
+        journal = PageJournal(get_journal_path(output_path), fingerprint, logger, resume)
+        try:
+            # Journaled and cached pages keep every field of their record, so the output does not depend on them
+            for i, record in journal.completed.items():
+                write_page(i, reused_record(record, "journal"))
+            ocr_indices = [i for i in ocr_indices if i not in journal.completed]
+            for i, text in page_texts.items():
+                if i not in journal.completed:
+                    record = {"text": text, "source": "text_layer"}
+                    journal.record(i, record)
+                    write_page(i, record)
+
+            cache = ResultCache(cache_path or DEFAULT_CACHE_PATH) if use_cache and ocr_indices else None
+            if cache:
+                # Debug runs OCR every page again so the preprocessed images are written, but still refresh the cache
+                cached_records, ocr_indices, cache_keys = lookup_cached_pages(cache, pdf_hash, ocr_indices,
+                                                                              ocr_options, logger,
+                                                                              read=preprocess != "debug")
+                for i, record in cached_records.items():
+                    journal.record(i, record)
+                    write_page(i, reused_record(record, "cache"))
+
+            def page_done(i, record):
+                journal.record(i, record)
+                if cache:
+                    cache.put(cache_keys[i], record)
+                write_page(i, record)
+
+            if ocr_indices and workers > 1:
+                ocr_pages_parallel(pdf_path, ocr_indices, workers, logger, queue, ocr_options, debug_dir, page_done,
+                                   batch_window, skip_page)
+            elif ocr_indices:
+                ocr_pages_serial(pdf_path, ocr_indices, logger, queue, ocr_options, debug_dir, page_done, batch_window,
+                                 skip_page)
+            if cache:
+                cache.evict()
+        finally:
+            journal.close()
+
+        save_spelling_cache(corrector, logger)
         logger.info("Text extraction completed.")
-        return extracted_text
+        return pages_written
 
     
     except Exception as e:
         logger.error(f"Error processing PDF: {str(e)}\n{traceback.format_exc()}")
-        return []
+        if os.path.exists(get_journal_path(output_path)):
+            logger.info("Pages finished so far are kept in the journal; run again with resume to continue.")
+        return 0
 
-def extract_text(file_path: str, output_path: str, logger, queue, basic, spellcheck) -> List[str]:
+def extract_text(file_path: str, output_path: str, logger, queue, basic, spellcheck, **options) -> int:
+    """Dispatches on the file type; options are the keyword arguments of extract_text_from_pdf."""
     file_extension = os.path.splitext(file_path)[1].lower()
     logger.info(f"Extracting text from file: {file_path}")
     if file_extension == '.pdf':
-        return extract_text_from_pdf(file_path, output_path, logger, queue, basic, spellcheck)
+        return extract_text_from_pdf(file_path, output_path, logger, queue, basic, spellcheck, **options)
     else:
         logger.warning(f"Unsupported file format: {file_extension}")
-        return []
+        return 0
 
-def save_extracted_text(text_list: List[str], output_path: str, logger) -> str:
-    if not text_list:
-        logger.warning("No text to save!")
-        return ""
-    
-    file_path = f"{output_path}"
-    logger.info(f"Saving extracted text to: {file_path}")
-    
-    with open(file_path, 'w', encoding='utf-8') as f:
-        for idx, text in enumerate(text_list, 1):
-            f.write(f"--- Page/Section {idx} ---\n")
-            f.write(text.strip())
-            f.write('\n\n')
-    
-    logger.info(f"Text successfully saved to: {file_path}")
-    return file_path
+def get_output_path(pdf_file: str, output_dir: str) -> str:
+    return f"{output_dir}/{os.path.splitext(os.path.basename(pdf_file))[0]}.txt"
 
-def main(pdf_file, output_path, logger, queue, basic, spellcheck):
+def main(pdf_file, output_path, logger, queue, basic, spellcheck, workers: int = 1, preprocess: str = "off",
+         preprocess_profile: str = "quality", hybrid: bool = False, text_layout: str = "plain",
+         spelling_cache: str = None, symspell: bool = False, use_cache: bool = True, cache_path: str = None,
+         resume: bool = False, batch_window: int = DEFAULT_BATCH_WINDOW, batch_size: int = DEFAULT_BATCH_SIZE,
+         output_formats=("txt",), metrics_report: bool = False, profiler: str = "off",
+         resolution: str = "fixed") -> dict:
+    """Extracts one PDF into <output_path>/<name>.txt and/or <name>.jsonl, writing each page as it finishes.
+
+    Time and memory spent in each stage are logged at the end, sent to queue as ('metrics', summary)
+    messages while the job runs and, with metrics_report, saved to <name>.metrics.json. profiler
+    adds a cProfile dump or tracemalloc allocation sites to that report.
+
+    Returns {"output_path": the first saved file, empty if nothing was saved, "outputs": every saved file,
+    "pages": pages extracted, "blank_pages": pages found blank and not OCRed, "sources": pages per source,
+    "metrics": per-stage summary}.
+    """
     logger.info(f"Starting processing for: {pdf_file}")
-    output_path = f"{output_path}/{os.path.splitext(os.path.basename(pdf_file))[0]}.txt"
+    output_path = get_output_path(pdf_file, output_path)
     logger.info(f"Output path {output_path}")
-    pdf_text = extract_text(pdf_file, output_path, logger, queue, basic, spellcheck)
-    if pdf_text:
-        save_extracted_text(pdf_text, output_path, logger)
-    logger.info("Processing completed.")
\ No newline at end of file
+    writers = open_page_writers(output_path, output_formats)
+    metrics = StageMetrics(queue)
+    page_sources = Counter()
+    profile_report = {}
+    with collecting(metrics), profiling(profiler, os.path.splitext(output_path)[0], profile_report):
+        pages = extract_text(pdf_file, output_path, logger, queue, basic, spellcheck, workers=workers,
+                             preprocess=preprocess, preprocess_profile=preprocess_profile, hybrid=hybrid,
+                             text_layout=text_layout, spelling_cache=spelling_cache, symspell=symspell,
+                             use_cache=use_cache, cache_path=cache_path, resume=resume, batch_window=batch_window,
+                             batch_size=batch_size, writers=writers, resolution=resolution, page_sources=page_sources)
+        outputs = []
+        if pages:
+            with stage("write"):
+                outputs = [writer.finish() for writer in writers]
+            logger.info(f"Text successfully saved to: {', '.join(outputs)}")
+            # The journal is only needed until the final text is safely written
+            journal_path = get_journal_path(output_path)
+            if os.path.exists(journal_path):
+                os.remove(journal_path)
+        else:
+            for writer in writers:
+                writer.discard()
+            logger.warning("No text to save!")
+
+    if page_sources["blank"]:
+        logger.info(f"Skipped OCR of {page_sources['blank']} blank page(s).")
+    metrics.publish(force=True)
+    metrics.log_summary(logger)
+    if metrics_report:
+        report_path = get_format_path(output_path, "metrics.json")
+        metrics.save(report_path, {"pdf": pdf_file, "pages_written": pages, "sources": dict(page_sources),
+                                   **profile_report})
+        logger.info(f"Timing report saved to: {report_path}")
+    logger.info("Processing completed.")
+    return {"output_path": outputs[0] if outputs else "", "outputs": outputs, "pages": pages,
+            "blank_pages": page_sources["blank"], "sources": dict(page_sources), "metrics": metrics.summary()}
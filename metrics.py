@@ -0,0 +1,196 @@
+"""Per-stage timing and memory instrumentation for extraction jobs.
+
+Code that does the work wraps each stage in `with stage("render", page_index):`. The measurements go
+to the StageMetrics collector made active for the current job with `collecting()`, and cost nothing
+when no collector is active.
+"""
+import contextvars
+import cProfile
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# off: no profiler, cprofile: save a .prof file of the job, tracemalloc: add the top allocation sites to the report
+PROFILERS = ("off", "cprofile", "tracemalloc")
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if it cannot be read on this platform."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _percentile(values, q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class StageMetrics:
+    """Collects wall time, CPU time and RSS change of every stage run during one job.
+
+    If a queue is given, a ('metrics', summary) message is put on it at most every update_interval
+    seconds so a UI can show a live breakdown.
+    """
+
+    def __init__(self, queue=None, update_interval: float = 1.0):
+        self.records = []
+        self.queue = queue
+        self.update_interval = update_interval
+        self._lock = threading.Lock()
+        self._last_update = 0.0
+
+    def record(self, name: str, page, wall: float, cpu: float, rss_delta):
+        self.extend([{"stage": name, "page": page, "wall_s": wall, "cpu_s": cpu,
+                      "rss_delta_mb": None if rss_delta is None else rss_delta / (1024 * 1024)}])
+
+    def extend(self, records):
+        """Adds records measured elsewhere, e.g. in an OCR worker process."""
+        with self._lock:
+            self.records.extend(records)
+        self.publish()
+
+    def publish(self, force: bool = False):
+        now = time.monotonic()
+        if self.queue is not None and (force or now - self._last_update >= self.update_interval):
+            self._last_update = now
+            self.queue.put(('metrics', self.summary()))
+
+    def summary(self) -> dict:
+        """Returns {stage: totals and latency percentiles}, stages in the order they first ran."""
+        with self._lock:
+            records = list(self.records)
+        by_stage = {}
+        for record in records:
+            by_stage.setdefault(record["stage"], []).append(record)
+
+        summary = {}
+        for name, stage_records in by_stage.items():
+            wall_ms = [record["wall_s"] * 1000 for record in stage_records]
+            rss_deltas = [record["rss_delta_mb"] for record in stage_records if record["rss_delta_mb"] is not None]
+            summary[name] = {
+                "count": len(stage_records),
+                "wall_s": round(sum(wall_ms) / 1000, 3),
+                "cpu_s": round(sum(record["cpu_s"] for record in stage_records), 3),
+                "mean_ms": round(sum(wall_ms) / len(wall_ms), 2),
+                "p50_ms": round(_percentile(wall_ms, 50), 2),
+                "p95_ms": round(_percentile(wall_ms, 95), 2),
+                "max_rss_delta_mb": round(max(rss_deltas), 1) if rss_deltas else None,
+            }
+        return summary
+
+    def pages(self) -> dict:
+        """Returns {page number: {stage: wall seconds}} for the stages that ran on a single page."""
+        pages = {}
+        with self._lock:
+            records = list(self.records)
+        for record in records:
+            if record["page"] is not None:
+                page = pages.setdefault(record["page"] + 1, {})
+                page[record["stage"]] = round(page.get(record["stage"], 0.0) + record["wall_s"], 4)
+        return dict(sorted(pages.items()))
+
+    def report(self) -> dict:
+        rss = current_rss()
+        return {"stages": self.summary(), "pages": self.pages(),
+                "rss_mb": None if rss is None else round(rss / (1024 * 1024), 1)}
+
+    def log_summary(self, logger):
+        for name, stats in self.summary().items():
+            logger.info(f"Stage {name}: {stats['count']} run(s), {stats['wall_s']:.2f}s wall, "
+                        f"{stats['cpu_s']:.2f}s CPU, p50 {stats['p50_ms']:.1f} ms, p95 {stats['p95_ms']:.1f} ms")
+
+    def save(self, path: str, extra: dict = None):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({**self.report(), **(extra or {})}, f, indent=2)
+
+
+_active = contextvars.ContextVar("stage_metrics", default=None)
+
+
+def active_metrics():
+    return _active.get()
+
+
+@contextmanager
+def collecting(metrics: StageMetrics):
+    """Makes metrics the collector for stages run in this thread until the block ends."""
+    token = _active.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _active.reset(token)
+
+
+@contextmanager
+def shared_stage(name: str, pages: dict):
+    """Measures the block as one run of stage `name` that served several pages.
+
+    pages is {0-based page: weight}; the measurements are split between the pages by weight.
+    """
+    metrics = _active.get()
+    if metrics is None:
+        yield
+        return
+    rss = current_rss()
+    cpu = time.process_time()
+    wall = time.perf_counter()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - wall
+        cpu = time.process_time() - cpu
+        rss_after = current_rss()
+        rss_delta = None if rss is None or rss_after is None else rss_after - rss
+        total = sum(pages.values()) or 1
+        for page, weight in pages.items():
+            share = weight / total
+            metrics.record(name, page, wall * share, cpu * share, None if rss_delta is None else rss_delta * share)
+
+
+def stage(name: str, page: int = None):
+    """Measures the block as one run of stage `name` for the given 0-based page."""
+    return shared_stage(name, {page: 1})
+
+
+@contextmanager
+def profiling(profiler: str, path_prefix: str, report: dict):
+    """Runs the block under cProfile or tracemalloc and puts what they found into report."""
+    if profiler not in PROFILERS:
+        raise ValueError(f"Unknown profiler: {profiler}")
+    if profiler == "cprofile":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            profile.dump_stats(f"{path_prefix}.prof")
+            report["cprofile"] = f"{path_prefix}.prof"
+    elif profiler == "tracemalloc":
+        tracemalloc.start(10)
+        try:
+            yield
+        finally:
+            snapshot = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report["tracemalloc"] = {
+                "peak_mb": round(peak / (1024 * 1024), 1),
+                "top": [{"where": str(stat.traceback[0]), "size_kb": round(stat.size / 1024, 1), "count": stat.count}
+                        for stat in snapshot.statistics("lineno")[:25]],
+            }
+    else:
+        yield
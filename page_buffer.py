@@ -0,0 +1,123 @@
+"""One rendered page held as a single NumPy array that every pipeline stage reads without copying."""
+import weakref
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class _PixmapSamples:
+    """Exposes the samples of a PyMuPDF pixmap to NumPy.
+
+    Arrays made from it, and every view of them, hold a reference to it and so keep the pixmap alive.
+    """
+
+    def __init__(self, pixmap):
+        self.pixmap = pixmap
+        self.__array_interface__ = {
+            "version": 3, "typestr": "|u1", "data": (pixmap.samples_ptr, False),
+            "shape": (pixmap.height, pixmap.width, pixmap.n), "strides": (pixmap.stride, pixmap.n, 1),
+        }
+
+
+class _SharedSamples:
+    """Exposes a shared memory block to NumPy as pixels of the given shape.
+
+    Arrays made from it, and every view of them, hold a reference to it; the block is unmapped when the
+    last of them is gone rather than when PageBuffer.close() is called.
+    """
+
+    def __init__(self, shm: shared_memory.SharedMemory, shape: tuple):
+        address = np.frombuffer(shm.buf, dtype=np.uint8).ctypes.data
+        self.__array_interface__ = {"version": 3, "typestr": "|u1", "data": (address, False), "shape": shape}
+        weakref.finalize(self, shm.close)
+
+
+class PageBuffer:
+    """A rendered page as a contiguous (height, width, 3) RGB or (height, width) grayscale uint8 array.
+
+    The grayscale plane is computed on first use and kept, so blank detection, preprocessing and
+    column detection share one conversion. region() returns slice views, not copies.
+
+    A buffer made with shared=True lives in shared memory: pass handle() to another process and
+    PageBuffer.attach() maps the same pixels there without pickling them. The process that created it
+    calls unlink() once every process is done with it; every process calls close().
+    Region views outlive close(): the memory is unmapped once the last of them is gone.
+    """
+
+    def __init__(self, pixels: np.ndarray, shm: shared_memory.SharedMemory = None):
+        self.pixels = pixels
+        self._shm = shm
+        self._gray = pixels if pixels.ndim == 2 else None
+
+    @classmethod
+    def from_pixmap(cls, pixmap, shared: bool = False) -> "PageBuffer":
+        """Wraps the pixmap's samples without copying them, or copies them once into shared memory."""
+        pixels = np.asarray(_PixmapSamples(pixmap))
+        if pixmap.n == 1:
+            pixels = pixels[:, :, 0]
+        if shared:
+            return cls.from_array(pixels, shared=True)
+        return cls(pixels)
+
+    @classmethod
+    def from_array(cls, pixels, shared: bool = False) -> "PageBuffer":
+        """Wraps an array (or a PIL image), copying it only if it is not contiguous uint8 or must be shared."""
+        if isinstance(pixels, PageBuffer):
+            pixels = pixels.pixels
+        if not shared:
+            return cls(np.ascontiguousarray(np.asarray(pixels), dtype=np.uint8))
+        pixels = np.asarray(pixels, dtype=np.uint8)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, pixels.nbytes))
+        shared_pixels = np.asarray(_SharedSamples(shm, pixels.shape))
+        shared_pixels[...] = pixels
+        return cls(shared_pixels, shm=shm)
+
+    @classmethod
+    def attach(cls, handle: tuple) -> "PageBuffer":
+        """Maps a buffer another process created with shared=True, from its handle()."""
+        name, shape = handle
+        shm = shared_memory.SharedMemory(name=name)
+        return cls(np.asarray(_SharedSamples(shm, tuple(shape))), shm=shm)
+
+    def handle(self) -> tuple:
+        if self._shm is None:
+            raise ValueError("Only buffers created with shared=True can be passed to other processes")
+        return self._shm.name, self.pixels.shape
+
+    @property
+    def width(self) -> int:
+        return self.pixels.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.pixels.shape[0]
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self._gray is None:
+            import cv2
+            self._gray = cv2.cvtColor(self.pixels, cv2.COLOR_RGB2GRAY)
+        return self._gray
+
+    def region(self, box: tuple) -> np.ndarray:
+        """View of the (left, top, right, bottom) box of the page."""
+        left, top, right, bottom = box
+        return self.pixels[top:bottom, left:right]
+
+    def __array__(self, dtype=None, copy=None):
+        return self.pixels if dtype is None else self.pixels.astype(dtype)
+
+    def close(self):
+        """Drops this buffer's pixels; a shared buffer is unmapped once no region view of it is left either."""
+        if self._shm is not None:
+            self.pixels = self._gray = None
+
+    def unlink(self):
+        """Frees the shared memory of a buffer this process created."""
+        if self._shm is not None:
+            self._shm.unlink()
+
+
+def as_page_buffer(image) -> PageBuffer:
+    """Returns image if it already is a PageBuffer, otherwise wraps it (a PIL image is converted once)."""
+    return image if isinstance(image, PageBuffer) else PageBuffer.from_array(image)
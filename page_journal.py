@@ -0,0 +1,67 @@
+"""Append-only journal of finished pages, so an interrupted extraction can resume where it stopped."""
+import json
+import os
+
+
+def get_journal_path(output_path: str) -> str:
+    return output_path.replace(".txt", ".journal.jsonl")
+
+
+class PageJournal:
+    """JSON Lines file: a header with the job fingerprint, then the record of each finished page with its "page".
+
+    Each record is flushed and synced to disk as soon as it is written. A crash loses at most the page
+    being written, and a half-written last line is ignored when the journal is read back.
+    """
+
+    def __init__(self, path: str, fingerprint: dict, logger, resume: bool = False):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.completed = {}
+        if resume:
+            self.completed = self._load(logger)
+        else:
+            self.remove()
+        self._file = open(path, 'a', encoding='utf-8')
+        if not self.completed:
+            # Start over, dropping anything from a job with a different fingerprint
+            self._file.truncate(0)
+            self._write({"fingerprint": fingerprint})
+
+    def _load(self, logger) -> dict:
+        if not os.path.exists(self.path):
+            logger.info("No journal found, starting from the first page.")
+            return {}
+        records = self._read_records()
+        header = next(records, None)
+        if header is None or header.get("fingerprint") != self.fingerprint:
+            logger.warning("Journal belongs to a different file or settings, starting from the first page.")
+            return {}
+        completed = {record.pop("page"): record for record in records}
+        logger.info(f"Resuming: {len(completed)} page(s) already completed in {self.path}")
+        return completed
+
+    def _read_records(self):
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    # The job was killed while this line was being written
+                    return
+
+    def _write(self, record: dict):
+        self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def record(self, page_index: int, record: dict):
+        self._write({"page": page_index, **record})
+
+    def close(self):
+        if not self._file.closed:
+            self._file.close()
+
+    def remove(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
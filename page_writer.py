@@ -0,0 +1,109 @@
+"""Output writers that put each page on disk as soon as it is finished, instead of after the whole document."""
+import json
+import os
+
+OUTPUT_FORMATS = ("txt", "jsonl")
+
+
+def get_format_path(output_path: str, output_format: str) -> str:
+    return f"{os.path.splitext(output_path)[0]}.{output_format}"
+
+
+class PageWriter:
+    """Streams pages to <path>.part and renames it to path once the document is complete.
+
+    The .part file is flushed after every page, so other programs can follow it while a long
+    document is still running. A failed or interrupted job never leaves a file at path.
+
+    Pages are passed in as records: {"text", "source", and for OCRed pages "seconds" and "columns"}.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.part_path = f"{path}.part"
+        self.pages_written = 0
+        self._file = open(self.part_path, 'w', encoding='utf-8')
+
+    def write_page(self, page_index: int, record: dict):
+        raise NotImplementedError
+
+    def skip_page(self, page_index: int):
+        """Called for pages that failed, so writers that keep page order do not wait for them."""
+
+    def finish(self) -> str:
+        """Completes the file and returns its path, or an empty string if no page was written."""
+        self._file.close()
+        if not self.pages_written:
+            os.remove(self.part_path)
+            return ""
+        os.replace(self.part_path, self.path)
+        return self.path
+
+    def discard(self):
+        self._file.close()
+        if os.path.exists(self.part_path):
+            os.remove(self.part_path)
+
+
+class TextPageWriter(PageWriter):
+    """Plain text with a "--- Page/Section N ---" header before each page, in page order.
+
+    Pages that finish early wait in memory until every page before them has been written or skipped.
+    """
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._next_page = 0
+        self._pending = {}
+
+    def write_page(self, page_index: int, record: dict):
+        self._pending[page_index] = record["text"]
+        self._drain()
+
+    def skip_page(self, page_index: int):
+        self._pending[page_index] = None
+        self._drain()
+
+    def _drain(self):
+        while self._next_page in self._pending:
+            self._write_section(self._pending.pop(self._next_page))
+            self._next_page += 1
+        self._file.flush()
+
+    def _write_section(self, text: str):
+        if text is None:
+            return
+        self.pages_written += 1
+        self._file.write(f"--- Page/Section {self.pages_written} ---\n")
+        self._file.write(text.strip())
+        self._file.write('\n\n')
+
+    def finish(self) -> str:
+        # Only reached with gaps if some pages were neither written nor skipped
+        for page_index in sorted(self._pending):
+            self._write_section(self._pending[page_index])
+        self._pending.clear()
+        return super().finish()
+
+
+class JsonlPageWriter(PageWriter):
+    """JSON Lines with one record per page, written in the order pages finish.
+
+    Every record carries its 1-based "page" number. OCRed pages also list their columns, each with
+    its box on the page and the recognized lines with their box and confidence.
+    """
+
+    def write_page(self, page_index: int, record: dict):
+        self._file.write(json.dumps({"page": page_index + 1, **record}, ensure_ascii=False) + "\n")
+        self._file.flush()
+        self.pages_written += 1
+
+
+def open_page_writers(output_path: str, output_formats=("txt",)) -> list:
+    """Opens one writer per requested format, next to output_path."""
+    writer_classes = {"txt": TextPageWriter, "jsonl": JsonlPageWriter}
+    for output_format in output_formats:
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {output_format}")
+    return [writer_classes[output_format](get_format_path(output_path, output_format))
+            for output_format in output_formats]
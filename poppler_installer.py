@@ -4,6 +4,7 @@ import zipfile
 import subprocess
 import sys
 import logging
+import threading
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -117,12 +118,20 @@ def add_to_path(bin_path, logger):
         subprocess.run(f'setx PATH "{current_path};{bin_path}"', shell=True)
         logger.info("Poppler path added permanently! Restart your terminal to apply changes.")
 
+_setup_lock = threading.Lock()
+_setup_done = False
+
 def decider(logger):
-    """Main function to install Poppler and TextBlob if needed"""
-    if not is_poppler_installed(logger):
-        install_poppler(logger)
-    else:
-        logger.info("Poppler is already installed. No need to install again.")
+    """Main function to install Poppler and TextBlob if needed. The checks only run once per process."""
+    global _setup_done
+    with _setup_lock:
+        if _setup_done:
+            return
+        if not is_poppler_installed(logger):
+            install_poppler(logger)
+        else:
+            logger.info("Poppler is already installed. No need to install again.")
+        _setup_done = True
 
     # if not is_textblob_installed(logger):
     #     install_textblob(logger)
@@ -0,0 +1,124 @@
+"""On-disk cache of per-page OCR records, keyed by the PDF's content and the extraction settings.
+
+Usage:
+    python result_cache.py --stats
+    python result_cache.py --clear
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import closing
+from importlib.metadata import PackageNotFoundError, version
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".pdf_extractor", "ocr_cache.sqlite3")
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+
+def hash_file(path: str, chunk_size: int = 1 << 20) -> str:
+    """SHA-256 of the file contents, so renamed or re-downloaded copies still hit the cache."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def ocr_model_version(languages=('en',)) -> str:
+    """Identifies the OCR model without importing easyocr."""
+    try:
+        easyocr_version = version("easyocr")
+    except PackageNotFoundError:
+        easyocr_version = "unknown"
+    return f"easyocr-{easyocr_version}-{'+'.join(languages)}"
+
+
+class ResultCache:
+    """SQLite-backed page cache with least-recently-used eviction once it grows past max_bytes.
+
+    A connection is opened per operation, so one instance can be shared by threads and several
+    processes can use the same file.
+    """
+
+    def __init__(self, path: str = DEFAULT_CACHE_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS page_records ("
+                         "key TEXT PRIMARY KEY, record TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS page_records_last_used ON page_records (last_used)")
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def page_key(pdf_hash: str, page_index: int, settings: dict) -> str:
+        payload = json.dumps({"pdf": pdf_hash, "page": page_index, "settings": settings}, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get_many(self, keys) -> dict:
+        """Returns {key: page record} for the keys that are cached and marks them as recently used."""
+        keys = list(keys)
+        found = {}
+        with closing(self._connect()) as conn, conn:
+            # Stay below SQLite's limit on the number of bound parameters
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(f"SELECT key, record FROM page_records WHERE key IN ({placeholders})", batch)
+                found.update((key, json.loads(record)) for key, record in rows)
+            conn.executemany("UPDATE page_records SET last_used = ? WHERE key = ?",
+                             [(time.time(), key) for key in found])
+        return found
+
+    def put(self, key: str, record: dict):
+        data = json.dumps(record, ensure_ascii=False)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR REPLACE INTO page_records (key, record, size, last_used) VALUES (?, ?, ?, ?)",
+                         (key, data, len(data.encode('utf-8')), time.time()))
+
+    def evict(self) -> int:
+        """Deletes least recently used pages until the cache fits in max_bytes. Returns the number removed."""
+        removed = 0
+        with closing(self._connect()) as conn, conn:
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM page_records").fetchone()[0]
+            rows = conn.execute("SELECT key, size FROM page_records ORDER BY last_used")
+            doomed = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                doomed.append((key,))
+                total -= size
+            conn.executemany("DELETE FROM page_records WHERE key = ?", doomed)
+            removed = len(doomed)
+        return removed
+
+    def clear(self):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM page_records")
+        with closing(self._connect()) as conn:
+            conn.execute("VACUUM")
+
+    def stats(self) -> dict:
+        with closing(self._connect()) as conn:
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM page_records").fetchone()
+        return {"entries": entries, "bytes": size, "max_bytes": self.max_bytes, "path": self.path}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Inspect or clear the OCR result cache.")
+    parser.add_argument("--path", default=DEFAULT_CACHE_PATH, help="Cache database file.")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--stats", action="store_true", help="Print the number of cached pages and their size.")
+    group.add_argument("--clear", action="store_true", help="Delete every cached page.")
+    args = parser.parse_args()
+
+    cache = ResultCache(args.path)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {args.path}")
+    else:
+        print(json.dumps(cache.stats(), indent=2))
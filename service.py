@@ -0,0 +1,485 @@
+"""Long-running local extraction service that keeps the OCR model loaded between documents.
+
+Other programs on the same machine submit PDFs over HTTP on localhost and follow their progress:
+
+    POST /jobs               {"path": "/abs/file.pdf", "options": {"hybrid": true}} -> 202 {"id": ...}
+                             503 with Retry-After when the job queue is full
+    GET  /jobs/<id>          state of the job, and main()'s result once it is done
+    GET  /jobs/<id>/events   newline-delimited JSON events: progress, metrics, one per finished page, then done/failed
+    GET  /status             queue depth, running jobs and throughput
+
+Usage:
+    python service.py --port 8765 -o extracted/ --concurrency 2 --queue-size 16
+"""
+import argparse
+import json
+import logging
+import os
+import queue
+import re
+import threading
+import time
+import traceback
+import urllib.error
+import urllib.request
+import uuid
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from full_implementation_1 import (DEFAULT_BATCH_SIZE, DEFAULT_BATCH_WINDOW, PREPROCESS_MODES, PREPROCESS_PROFILES,
+                                  RESOLUTION_POLICIES, TEXT_LAYOUTS, main, release_readers, warm_up_reader)
+from page_writer import OUTPUT_FORMATS
+
+DEFAULT_PORT = 8765
+DEFAULT_QUEUE_SIZE = 16
+# Finished jobs kept for /jobs/<id>; the oldest are forgotten first
+MAX_FINISHED_JOBS = 200
+# Finished jobs whose events still carry the full page records; older ones keep only page numbers
+MAX_JOBS_WITH_PAGES = 10
+# Seconds of finished jobs the throughput in /status is computed over
+THROUGHPUT_WINDOW = 300
+RETRY_AFTER_SECONDS = 5
+
+# Options a job may set, with their defaults. Page-level OCR processes and profilers are left out:
+# the service runs OCR in its own process, where the model is already loaded.
+JOB_OPTIONS = {
+    "basic": False, "spellcheck": False, "hybrid": False, "symspell": False, "use_cache": True,
+    "preprocess": "off", "preprocess_profile": "quality", "text_layout": "plain", "resolution": "fixed",
+    "output_formats": ["txt"], "batch_window": DEFAULT_BATCH_WINDOW, "batch_size": DEFAULT_BATCH_SIZE,
+    "metrics_report": False,
+}
+OPTION_CHOICES = {"preprocess": PREPROCESS_MODES, "preprocess_profile": PREPROCESS_PROFILES,
+                  "text_layout": TEXT_LAYOUTS, "resolution": RESOLUTION_POLICIES}
+
+
+def validate_options(options: dict) -> dict:
+    """Returns the job options with defaults filled in, or raises ValueError."""
+    unknown = set(options) - set(JOB_OPTIONS)
+    if unknown:
+        raise ValueError(f"Unknown option(s): {', '.join(sorted(unknown))}")
+    options = {**JOB_OPTIONS, **options}
+    for name, default in JOB_OPTIONS.items():
+        value = options[name]
+        if isinstance(default, bool) and not isinstance(value, bool):
+            raise ValueError(f"{name} must be true or false")
+        # bool is a subclass of int, so true must not pass for 1
+        if isinstance(default, int) and not isinstance(default, bool) \
+                and (not isinstance(value, int) or isinstance(value, bool) or value < 1):
+            raise ValueError(f"{name} must be a positive whole number")
+        if name in OPTION_CHOICES and value not in OPTION_CHOICES[name]:
+            raise ValueError(f"{name} must be one of: {', '.join(OPTION_CHOICES[name])}")
+    formats = options["output_formats"]
+    if not isinstance(formats, list) or not formats or any(fmt not in OUTPUT_FORMATS for fmt in formats):
+        raise ValueError(f"output_formats must be a list of: {', '.join(OUTPUT_FORMATS)}")
+    options["output_formats"] = tuple(formats)
+    return options
+
+
+class Job:
+    """One submitted document.
+
+    It is also the queue main() reports to: every message it puts becomes an event that /jobs/<id>/events
+    streams, so clients see each page as soon as it is written.
+    """
+
+    def __init__(self, pdf_path: str, options: dict, output_dir: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.pdf_path = pdf_path
+        self.options = options
+        self.output_dir = os.path.join(output_dir, self.id)
+        self.status = "queued"
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.percent = 0.0
+        self.pages_done = 0
+        self.result = None
+        self.error = None
+        self._events = []
+        self._has_page_payloads = True
+        self._changed = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status in ("done", "failed")
+
+    def put(self, message):
+        kind, value = message[0], message[1] if len(message) > 1 else None
+        if kind == 'progress':
+            self.percent = value
+            event = {"type": "progress", "percent": round(value, 1)}
+        elif kind == 'metrics':
+            event = {"type": "metrics", "stages": value}
+        elif kind == 'page':
+            page_index, record = value
+            self.pages_done += 1
+            event = {"type": "page", "page": page_index + 1, **record}
+        else:
+            return
+        self._add_event(event)
+
+    def start(self):
+        self.status = "running"
+        self.started = time.time()
+        self._add_event({"type": "started"})
+
+    def finish(self, result: dict = None, error: str = None):
+        # Under the lock, so a reader never sees the job done without its final event
+        with self._changed:
+            self.finished = time.time()
+            self.result = result
+            self.error = error
+            self.status = "failed" if error else "done"
+            self._events.append({"type": self.status, **self.to_dict()})
+            self._changed.notify_all()
+
+    def drop_page_payloads(self):
+        """Keeps only the page number and source of each page event; the text stays in the output files."""
+        with self._changed:
+            if self._has_page_payloads:
+                self._events = [{"type": "page", "page": event["page"], "source": event["source"]}
+                                if event["type"] == "page" else event for event in self._events]
+                self._has_page_payloads = False
+
+    def _add_event(self, event: dict):
+        with self._changed:
+            self._events.append(event)
+            self._changed.notify_all()
+
+    def events(self, timeout: float = None):
+        """Yields every event of the job, waiting for new ones until it is done.
+
+        Stops early if nothing happens for timeout seconds.
+        """
+        position = 0
+        while True:
+            with self._changed:
+                if position == len(self._events) and not self.done:
+                    if not self._changed.wait(timeout):
+                        return
+                new_events = self._events[position:]
+                finished = self.done
+            position += len(new_events)
+            yield from new_events
+            if finished and position == len(self._events):
+                return
+
+    def to_dict(self) -> dict:
+        return {"id": self.id, "pdf": self.pdf_path, "status": self.status, "percent": round(self.percent, 1),
+                "pages_done": self.pages_done, "submitted": self.submitted, "started": self.started,
+                "finished": self.finished, "result": self.result, "error": self.error}
+
+
+class ExtractionService:
+    """Runs submitted jobs with at most `concurrency` at a time; up to queue_size more may wait.
+
+    Jobs run in threads of this process and share its cached OCR reader, so only the first OCR job,
+    or the warm-up at start, pays for loading the model.
+    """
+
+    def __init__(self, output_dir: str, logger, queue_size: int = DEFAULT_QUEUE_SIZE, concurrency: int = 1,
+                 warm_up: bool = True, spelling_cache: str = None, cache_path: str = None):
+        self.output_dir = output_dir
+        self.logger = logger
+        self.queue_size = queue_size
+        self.concurrency = concurrency
+        self.warm_up = warm_up
+        self.spelling_cache = spelling_cache
+        self.cache_path = cache_path
+        self.started = None
+        self._pending = queue.Queue(maxsize=queue_size)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._running = 0
+        self._totals = {"done": 0, "failed": 0, "pages": 0}
+        self._recent = deque()
+        self._threads = []
+        self._stopping = False
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.started = time.time()
+        if self.warm_up:
+            threading.Thread(target=warm_up_reader, args=(self.logger,), daemon=True).start()
+        for n in range(self.concurrency):
+            thread = threading.Thread(target=self._run_jobs, name=f"job-runner-{n + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        self.logger.info(f"Extraction service started: {self.concurrency} job(s) at a time, "
+                         f"up to {self.queue_size} waiting.")
+
+    def stop(self, timeout: float = None):
+        """Lets running jobs finish and stops the job runners; jobs still waiting fail without being run.
+
+        The OCR model is released afterwards, so a service embedded in a longer-lived process gives its memory back.
+        """
+        with self._lock:
+            self._stopping = True
+        while True:
+            try:
+                job = self._pending.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None:
+                self._cancel(job)
+        # The queue is empty now; each runner that takes this puts it back for the next one
+        if self._threads:
+            self._pending.put_nowait(None)
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        release_readers(self.logger)
+
+    def submit(self, pdf_path: str, options: dict = None) -> Job:
+        """Queues a PDF. Raises ValueError for bad input and queue.Full when the queue has no room."""
+        if not os.path.isfile(pdf_path):
+            raise ValueError(f"No such file: {pdf_path}")
+        if os.path.splitext(pdf_path)[1].lower() != ".pdf":
+            raise ValueError(f"Not a PDF file: {pdf_path}")
+        job = Job(os.path.abspath(pdf_path), validate_options(options or {}), self.output_dir)
+        with self._lock:
+            if self._stopping:
+                raise queue.Full("The service is stopping")
+            self._pending.put_nowait(job)
+            self._jobs[job.id] = job
+            self._forget_old_jobs()
+        self.logger.info(f"Queued job {job.id}: {job.pdf_path}")
+        return job
+
+    def get_job(self, job_id: str) -> Job:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _forget_old_jobs(self):
+        """Bounds the memory finished jobs hold, however many pages the service has processed."""
+        finished = sorted((job for job in self._jobs.values() if job.done), key=lambda job: job.finished)
+        for job in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self._jobs[job.id]
+        for job in finished[:max(0, len(finished) - MAX_JOBS_WITH_PAGES)]:
+            job.drop_page_payloads()
+
+    def _run_jobs(self):
+        while True:
+            job = self._pending.get()
+            if job is None:
+                self._pending.put_nowait(None)
+                return
+            if self._stopping:
+                self._cancel(job)
+                continue
+            with self._lock:
+                self._running += 1
+            try:
+                self._run_job(job)
+            finally:
+                with self._lock:
+                    self._running -= 1
+
+    def _run_job(self, job: Job):
+        self.logger.info(f"Starting job {job.id}: {job.pdf_path}")
+        job.start()
+        try:
+            os.makedirs(job.output_dir, exist_ok=True)
+            options = dict(job.options)
+            result = main(job.pdf_path, job.output_dir, self.logger, job, options.pop("basic"),
+                          options.pop("spellcheck"), spelling_cache=self.spelling_cache,
+                          cache_path=self.cache_path, **options)
+        except Exception as e:
+            self.logger.error(f"Job {job.id} failed: {e}\n{traceback.format_exc()}")
+            job.finish(error=str(e))
+        else:
+            job.finish(result)
+            self.logger.info(f"Finished job {job.id}: {result['pages']} page(s) "
+                             f"in {job.finished - job.started:.1f}s")
+        self._count_finished(job)
+
+    def _cancel(self, job: Job):
+        job.finish(error="The service stopped before the job could run")
+        self.logger.info(f"Cancelled job {job.id}: {job.pdf_path}")
+        self._count_finished(job)
+
+    def _count_finished(self, job: Job):
+        with self._lock:
+            self._forget_old_jobs()
+            self._totals[job.status] += 1
+            self._totals["pages"] += job.pages_done
+            self._recent.append((job.finished, job.pages_done))
+
+    def status(self) -> dict:
+        """Queue depth, jobs by state and pages/jobs per second over the last THROUGHPUT_WINDOW seconds."""
+        now = time.time()
+        with self._lock:
+            while self._recent and self._recent[0][0] < now - THROUGHPUT_WINDOW:
+                self._recent.popleft()
+            window = max(1e-9, min(THROUGHPUT_WINDOW, now - (self.started or now)))
+            return {
+                "queued": self._pending.qsize(), "queue_size": self.queue_size,
+                "running": self._running, "concurrency": self.concurrency,
+                "done": self._totals["done"], "failed": self._totals["failed"], "pages": self._totals["pages"],
+                "uptime_s": round(now - self.started, 1) if self.started else 0.0,
+                "pages_per_s": round(sum(pages for _, pages in self._recent) / window, 3),
+                "jobs_per_s": round(len(self._recent) / window, 4),
+            }
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    server_version = "PDFExtractor/1.0"
+
+    def do_GET(self):
+        service = self.server.service
+        if self.path == "/status":
+            return self.send_json(200, service.status())
+        match = re.fullmatch(r"/jobs/(\w+)(/events)?", self.path)
+        job = service.get_job(match.group(1)) if match else None
+        if job is None:
+            return self.send_json(404, {"error": "Not found"})
+        if not match.group(2):
+            return self.send_json(200, job.to_dict())
+
+        # No Content-Length: events are written as they happen and the connection closes after the last one
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        try:
+            for event in job.events():
+                self.wfile.write(json.dumps(event, ensure_ascii=False).encode("utf-8") + b"\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_POST(self):
+        if self.path != "/jobs":
+            return self.send_json(404, {"error": "Not found"})
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if not isinstance(body, dict) or not isinstance(body.get("path"), str):
+                raise ValueError('Expected a JSON object with a "path"')
+            job = self.server.service.submit(body["path"], body.get("options"))
+        except (ValueError, TypeError) as e:
+            return self.send_json(400, {"error": str(e)})
+        except queue.Full:
+            return self.send_json(503, {"error": "Job queue is full, try again later"},
+                                  {"Retry-After": str(RETRY_AFTER_SECONDS)})
+        self.send_json(202, job.to_dict(), {"Location": f"/jobs/{job.id}"})
+
+    def send_json(self, code: int, body: dict, headers: dict = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        self.server.service.logger.debug(f"{self.address_string()} {format % args}")
+
+
+class ExtractionServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, service: ExtractionService, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        super().__init__((host, port), ServiceRequestHandler)
+        self.service = service
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+def start_server(service: ExtractionService, host: str = "127.0.0.1", port: int = 0) -> ExtractionServer:
+    """Starts the service and serves it from a background thread; port 0 picks a free port.
+
+    Stop it with server.shutdown(), server.server_close() and service.stop().
+    """
+    server = ExtractionServer(service, host, port)
+    service.start()
+    threading.Thread(target=server.serve_forever, name="service-http", daemon=True).start()
+    return server
+
+
+class ServiceClient:
+    """Client for the service's HTTP API, e.g. ServiceClient(start_server(service).url) in the same process."""
+
+    def __init__(self, url: str = f"http://127.0.0.1:{DEFAULT_PORT}", timeout: float = 30.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _open(self, path: str, body: dict = None, timeout: float = None):
+        data = None if body is None else json.dumps(body).encode("utf-8")
+        request = urllib.request.Request(f"{self.url}{path}", data=data,
+                                         headers={"Content-Type": "application/json"} if data else {})
+        try:
+            return urllib.request.urlopen(request, timeout=timeout or self.timeout)
+        except urllib.error.HTTPError as e:
+            message = json.loads(e.read() or b"{}").get("error", e.reason)
+            if e.code == 503:
+                raise queue.Full(message) from None
+            if e.code == 400:
+                raise ValueError(message) from None
+            if e.code == 404:
+                raise KeyError(path) from None
+            raise
+
+    def _json(self, path: str, body: dict = None) -> dict:
+        with self._open(path, body) as response:
+            return json.loads(response.read())
+
+    def submit(self, pdf_path: str, **options) -> dict:
+        """Queues a PDF and returns the new job. Raises queue.Full when the service is busy."""
+        return self._json("/jobs", {"path": os.path.abspath(pdf_path), "options": options})
+
+    def job(self, job_id: str) -> dict:
+        return self._json(f"/jobs/{job_id}")
+
+    def status(self) -> dict:
+        return self._json("/status")
+
+    def events(self, job_id: str, timeout: float = None):
+        """Yields the job's events as they happen, ending with its "done" or "failed" event."""
+        with self._open(f"/jobs/{job_id}/events", timeout=timeout) as response:
+            for line in response:
+                if line.strip():
+                    yield json.loads(line)
+
+    def wait(self, job_id: str, timeout: float = None) -> dict:
+        """Blocks until the job is finished and returns its final state."""
+        for event in self.events(job_id, timeout):
+            if event["type"] in ("done", "failed"):
+                return event
+        return self.job(job_id)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Serve PDF extraction jobs over HTTP on this machine.")
+    parser.add_argument("-o", "--output", default="service_output", help="Directory for the extracted files.")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on; keep it local.")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="Port to listen on.")
+    parser.add_argument("--concurrency", type=int, default=1, help="Jobs run at the same time.")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="Jobs that may wait; further submissions get 503 until there is room.")
+    parser.add_argument("--no-warm-up", action="store_true", help="Load the OCR model on the first OCR job instead.")
+    parser.add_argument("--spelling-cache", help="JSON file that keeps spelling corrections between runs.")
+    parser.add_argument("--cache-path", help="OCR result cache database.")
+    return parser
+
+
+if __name__ == "__main__":
+    args = build_parser().parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(threadName)s - %(levelname)s - %(message)s')
+    logger = logging.getLogger('PDFProcessor')
+    service = ExtractionService(args.output, logger, args.queue_size, max(1, args.concurrency),
+                                not args.no_warm_up, args.spelling_cache, args.cache_path)
+    server = ExtractionServer(service, args.host, args.port)
+    service.start()
+    logger.info(f"Listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping the extraction service.")
+    finally:
+        server.server_close()
+        service.stop()
@@ -0,0 +1,193 @@
+"""Cached spelling correction with the same output as TextBlob(text).correct().
+
+TextBlob corrects every token of every string from scratch, running Norvig's edit-distance search
+each time. SpellCorrector tokenizes the same way, skips tokens TextBlob would leave alone, and
+corrects each remaining unique token once. The results go into a bounded LRU cache that can be
+saved to disk between runs. An optional SymSpell-style deletion index replaces the brute-force
+edit generation with dictionary lookups.
+"""
+import json
+import os
+import re
+import string
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List
+
+from textblob.en import spelling, suggest
+
+# Same tokenization as TextBlob.correct: words, single punctuation marks and single whitespace characters
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]|\s")
+# Characters TextBlob returns unchanged, see textblob._text.PUNCTUATION
+PUNCTUATION = ".,;:!?()[]{}`''\"@#$^&*+-|=~_"
+MAX_EDIT_DISTANCE = 2
+
+
+def needs_correction(token: str) -> bool:
+    """False for tokens TextBlob's suggest() always returns unchanged."""
+    if len(token) == 1 or token in PUNCTUATION or token in string.whitespace:
+        return False
+    if token.replace(".", "").isdigit():
+        return False
+    return token not in spelling
+
+
+def damerau_levenshtein(a: str, b: str) -> int:
+    """Unrestricted Damerau-Levenshtein distance (insert, delete, substitute, adjacent transposition)."""
+    last_row_of = {}
+    max_dist = len(a) + len(b)
+    rows = [[max_dist] * (len(b) + 2) for _ in range(len(a) + 2)]
+    for i in range(len(a) + 1):
+        rows[i + 1][0] = max_dist
+        rows[i + 1][1] = i
+    for j in range(len(b) + 1):
+        rows[0][j + 1] = max_dist
+        rows[1][j + 1] = j
+    for i in range(1, len(a) + 1):
+        last_match_col = 0
+        for j in range(1, len(b) + 1):
+            k = last_row_of.get(b[j - 1], 0)
+            l = last_match_col
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            if cost == 0:
+                last_match_col = j
+            rows[i + 1][j + 1] = min(
+                rows[i][j] + cost,
+                rows[i + 1][j] + 1,
+                rows[i][j + 1] + 1,
+                rows[k][l] + (i - k - 1) + 1 + (j - l - 1),
+            )
+        last_row_of[a[i - 1]] = i
+    return rows[len(a) + 1][len(b) + 1]
+
+
+def _deletes(word: str, max_distance: int) -> set:
+    """All strings obtained by deleting up to max_distance characters from word, word included."""
+    results = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))} - results
+        results |= frontier
+    return results
+
+
+class SymSpellIndex:
+    """Deletion dictionary over TextBlob's word list that finds the same best candidate as suggest().
+
+    The dictionary contains only lowercase a-z words. For such words, being reachable with at most
+    two of Norvig's edits is the same as a Damerau-Levenshtein distance of at most two. Candidates
+    found through shared deletions are checked against that distance and then ranked like suggest():
+    the lowest distance first, then the highest word count, then ties broken in reverse string order.
+    """
+
+    def __init__(self, max_distance: int = MAX_EDIT_DISTANCE):
+        self.max_distance = max_distance
+        self.deletes = {}
+        for word in spelling:
+            for deleted in _deletes(word, max_distance):
+                self.deletes.setdefault(deleted, []).append(word)
+
+    def candidates(self, token: str) -> set:
+        found = set()
+        for deleted in _deletes(token, self.max_distance):
+            found.update(self.deletes.get(deleted, ()))
+        return found
+
+    def correct(self, token: str) -> str:
+        best = None
+        for candidate in self.candidates(token):
+            if abs(len(candidate) - len(token)) > self.max_distance:
+                continue
+            distance = damerau_levenshtein(token, candidate)
+            if distance > self.max_distance:
+                continue
+            rank = (-distance, spelling[candidate], candidate)
+            if best is None or rank > best:
+                best = rank
+        word = token if best is None else best[2]
+        return word.title() if token.istitle() else word
+
+
+class SpellCorrector:
+    """Document-level spelling correction with a bounded, optionally persistent word -> correction cache."""
+
+    def __init__(self, cache_path: str = None, max_cache_size: int = 100_000, use_symspell: bool = False):
+        self.cache_path = cache_path
+        self.max_cache_size = max_cache_size
+        self.use_symspell = use_symspell
+        self._index = None
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        if cache_path and os.path.exists(cache_path):
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                self._cache.update(json.load(f))
+
+    def _correct_token(self, token: str) -> str:
+        if self.use_symspell:
+            if self._index is None:
+                self._index = SymSpellIndex()
+            return self._index.correct(token)
+        return suggest(token)[0][0]
+
+    def _lookup(self, tokens) -> dict:
+        """Returns corrections for the given unique tokens, computing only the ones not cached yet."""
+        corrections = {}
+        with self._lock:
+            for token in tokens:
+                if token in self._cache:
+                    self._cache.move_to_end(token)
+                    corrections[token] = self._cache[token]
+        for token in tokens:
+            if token not in corrections:
+                corrections[token] = self._correct_token(token)
+        with self._lock:
+            for token, corrected in corrections.items():
+                self._cache[token] = corrected
+                self._cache.move_to_end(token)
+            while len(self._cache) > self.max_cache_size:
+                self._cache.popitem(last=False)
+        return corrections
+
+    def correct_texts(self, texts: List[str]) -> List[str]:
+        """Corrects several strings, tokenizing each once and correcting every unique unknown token once."""
+        tokenized = [TOKEN_PATTERN.findall(text) for text in texts]
+        unknown = {token for tokens in tokenized for token in tokens if needs_correction(token)}
+        corrections = self._lookup(unknown)
+        return [''.join(corrections.get(token, token) for token in tokens) for tokens in tokenized]
+
+    def correct(self, text: str) -> str:
+        return self.correct_texts([text])[0]
+
+    def save(self):
+        """Writes the cache to cache_path so the next run starts warm.
+
+        Each call writes its own temporary file, so jobs sharing this corrector can save at the same time.
+        """
+        if not self.cache_path:
+            return
+        with self._lock:
+            data = dict(self._cache)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.cache_path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.cache_path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+
+_correctors = {}
+_correctors_lock = threading.Lock()
+
+
+def get_spell_corrector(cache_path: str = None, use_symspell: bool = False) -> SpellCorrector:
+    """Returns the process-wide corrector for these settings so its cache is shared by every job."""
+    key = (cache_path, use_symspell)
+    with _correctors_lock:
+        corrector = _correctors.get(key)
+        if corrector is None:
+            corrector = SpellCorrector(cache_path, use_symspell=use_symspell)
+            _correctors[key] = corrector
+    return corrector
@@ -0,0 +1,74 @@
+"""Tests of the blank page check in prepare_page and prepare_page_adaptive on generated PDF pages.
+
+Usage:
+    python -m unittest test_blank_pages
+"""
+import logging
+import random
+import unittest
+
+import fitz
+
+from full_implementation_1 import prepare_page, prepare_page_adaptive, render_page_buffer
+
+logger = logging.getLogger('PDFProcessor.test')
+
+TEXT = "The quick brown fox jumps over the lazy dog"
+
+
+def blank_page(doc):
+    return doc.new_page()
+
+
+def noisy_page(doc):
+    """A blank scan: specks of dust too small to be glyphs, scattered over the page."""
+    page = doc.new_page()
+    rng = random.Random(0)
+    for _ in range(300):
+        point = fitz.Point(rng.uniform(0, page.rect.width), rng.uniform(0, page.rect.height))
+        page.draw_circle(point, 0.3, color=None, fill=(0, 0, 0))
+    return page
+
+
+def inverted_page(doc):
+    """A white-on-black cover. Its letters have no counters, so all its ink is one blob: the background."""
+    page = doc.new_page()
+    page.draw_rect(page.rect, color=None, fill=(0, 0, 0))
+    page.insert_text((72, 200), "TILT LIFT", fontsize=48, color=(1, 1, 1))
+    return page
+
+
+def text_page(doc):
+    page = doc.new_page()
+    page.insert_text((72, 100), TEXT, fontsize=14)
+    return page
+
+
+class BlankPageTest(unittest.TestCase):
+    def setUp(self):
+        self.doc = fitz.open()
+        self.addCleanup(self.doc.close)
+
+    def check(self, make_page, blank: bool):
+        page = make_page(self.doc)
+        for name, prepare in [("fixed", lambda: prepare_page(render_page_buffer(page), logger)),
+                              ("adaptive", lambda: prepare_page_adaptive(page, logger))]:
+            with self.subTest(resolution=name):
+                regions = prepare()
+                self.assertEqual(regions == [], blank)
+
+    def test_blank_page_is_skipped(self):
+        self.check(blank_page, blank=True)
+
+    def test_noisy_blank_page_is_skipped(self):
+        self.check(noisy_page, blank=True)
+
+    def test_inverted_text_page_is_kept(self):
+        self.check(inverted_page, blank=False)
+
+    def test_text_page_is_kept(self):
+        self.check(text_page, blank=False)
+
+
+if __name__ == "__main__":
+    unittest.main()
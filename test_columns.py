@@ -0,0 +1,105 @@
+"""Tests of the column detector on generated pages whose headline and column geometry is known.
+
+Usage:
+    python -m unittest test_columns
+"""
+import unittest
+
+import numpy as np
+
+from full_implementation_1 import find_column_boxes
+
+# A 200 DPI letter page; text lines are drawn as word-sized blocks of ink
+PAGE_WIDTH, PAGE_HEIGHT = 1700, 2200
+MARGIN = 150
+GUTTER = 70
+LINE_HEIGHT = 42
+GLYPH_HEIGHT = 28
+WORD_GAP = 14
+# Boxes are found on a downscaled copy, so their edges may be off by a few pixels
+TOLERANCE = 8
+
+
+def draw_line(page: np.ndarray, top: int, left: int, right: int, height: int = GLYPH_HEIGHT, word: int = 90):
+    """Inks a line from left to right, with a word gap every word pixels."""
+    page[top:top + height, left:right] = 0
+    for gap in range(left + word, right - word, word + WORD_GAP):
+        page[top:top + height, gap:gap + WORD_GAP] = 255
+
+
+def make_page(columns: int, headline: bool = True, long_first_line: int = 0, rule: bool = False):
+    """Returns (gray page, headline (top, bottom) or None, [(left, right), ...] of the columns, body top)."""
+    page = np.full((PAGE_HEIGHT, PAGE_WIDTH), 255, dtype=np.uint8)
+    column_width = (PAGE_WIDTH - 2 * MARGIN - GUTTER * (columns - 1)) // columns
+    spans = [(MARGIN + n * (column_width + GUTTER), MARGIN + n * (column_width + GUTTER) + column_width)
+             for n in range(columns)]
+    headline_rows = None
+    body_top = MARGIN
+    if headline:
+        headline_rows = (MARGIN, MARGIN + 56)
+        draw_line(page, MARGIN, MARGIN, spans[-1][1], height=56, word=160)
+        body_top = MARGIN + 56 + 110
+    for n, (left, right) in enumerate(spans):
+        for row, top in enumerate(range(body_top, PAGE_HEIGHT - MARGIN, LINE_HEIGHT)):
+            # The first line of the first column can reach into the gutter, as justified text sometimes does
+            extra = long_first_line if n == 0 and row == 0 else 0
+            draw_line(page, top, left, right + extra)
+    if rule:
+        for left, right in zip([right for _, right in spans], [left for left, _ in spans[1:]]):
+            middle = (left + right) // 2
+            page[MARGIN:PAGE_HEIGHT - MARGIN, middle - 2:middle + 2] = 0
+    return page, headline_rows, spans, body_top
+
+
+class FindColumnBoxesTest(unittest.TestCase):
+    def assertNear(self, actual, expected, message=None):
+        self.assertLessEqual(abs(actual - expected), TOLERANCE, message or f"{actual} is not near {expected}")
+
+    def check_columns(self, boxes, spans, body_top):
+        self.assertEqual(len(boxes), len(spans))
+        for (left, top, right, bottom), (expected_left, expected_right) in zip(boxes, spans):
+            self.assertNear(left, expected_left)
+            self.assertNear(right, expected_right)
+            self.assertLessEqual(top, body_top)
+            self.assertNear(bottom, PAGE_HEIGHT)
+
+    def test_headline_above_columns(self):
+        for columns in (2, 3, 4):
+            with self.subTest(columns=columns):
+                page, (headline_top, headline_bottom), spans, body_top = make_page(columns)
+                boxes = find_column_boxes(page)
+                left, top, right, bottom = boxes[0]
+                self.assertEqual(top, 0)
+                self.assertGreaterEqual(bottom, headline_bottom)
+                self.assertLess(bottom, body_top)
+                self.check_columns(boxes[1:], spans, body_top)
+                self.assertTrue(all(box[1] == bottom - 1 or box[1] == bottom for box in boxes[1:]))
+
+    def test_column_line_reaching_into_the_gutter_is_not_a_headline(self):
+        page, (_, headline_bottom), spans, body_top = make_page(3, long_first_line=GUTTER // 3)
+        boxes = find_column_boxes(page)
+        self.assertEqual(len(boxes), 4)
+        self.assertLess(boxes[0][3], body_top)
+        # The long line stays whole in its own column
+        self.check_columns(boxes[1:], [(spans[0][0], spans[0][1] + GUTTER // 3)] + spans[1:], body_top)
+
+    def test_columns_without_headline(self):
+        page, _, spans, body_top = make_page(3, headline=False)
+        boxes = find_column_boxes(page)
+        self.check_columns(boxes, spans, body_top)
+        self.assertTrue(all(box[1] == 0 for box in boxes))
+
+    def test_column_rules_are_not_a_headline(self):
+        page, _, spans, body_top = make_page(2, headline=False, rule=True)
+        boxes = find_column_boxes(page)
+        self.assertEqual(len(boxes), 2)
+        self.assertTrue(all(box[1] == 0 for box in boxes))
+
+    def test_single_column_and_blank_pages(self):
+        page, _, spans, _ = make_page(1, headline=False)
+        self.assertEqual(len(find_column_boxes(page)), 1)
+        self.assertEqual(find_column_boxes(np.full((PAGE_HEIGHT, PAGE_WIDTH), 255, dtype=np.uint8)), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
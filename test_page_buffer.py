@@ -0,0 +1,86 @@
+"""Tests of PageBuffer, including shared buffers passed to a spawned process.
+
+Usage:
+    python -m unittest test_page_buffer
+"""
+import gc
+import multiprocessing
+import unittest
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from page_buffer import PageBuffer
+
+BOX = (10, 20, 50, 40)
+
+
+def make_pixels() -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 256, size=(60, 80, 3), dtype=np.uint8)
+
+
+def read_and_mark(handle: tuple) -> bytes:
+    """Runs in the spawned process: returns the pixels of a region and blacks out the first pixel."""
+    buffer = PageBuffer.attach(handle)
+    region = buffer.region(BOX).tobytes()
+    buffer.pixels[0, 0] = 0
+    buffer.close()
+    return region
+
+
+class PageBufferTest(unittest.TestCase):
+    def test_regions_are_views(self):
+        pixels = make_pixels()
+        buffer = PageBuffer.from_array(pixels)
+        left, top, right, bottom = BOX
+        self.assertTrue(np.shares_memory(buffer.region(BOX), buffer.pixels))
+        np.testing.assert_array_equal(buffer.region(BOX), pixels[top:bottom, left:right])
+        self.assertEqual(buffer.gray.shape, (60, 80))
+
+    def test_plain_buffers_have_no_handle(self):
+        with self.assertRaises(ValueError):
+            PageBuffer.from_array(make_pixels()).handle()
+
+
+class SharedPageBufferTest(unittest.TestCase):
+    def setUp(self):
+        self.pixels = make_pixels()
+        self.pixels[0, 0] = 255
+        self.buffer = PageBuffer.from_array(self.pixels, shared=True)
+        self.name = self.buffer.handle()[0]
+
+    def tearDown(self):
+        self.buffer.close()
+        self.buffer.unlink()
+        # Nothing is left behind once the creator unlinks the block
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=self.name)
+
+    def test_spawned_process_sees_the_same_pixels(self):
+        with multiprocessing.get_context("spawn").Pool(1) as pool:
+            region = pool.apply(read_and_mark, (self.buffer.handle(),))
+        left, top, right, bottom = BOX
+        self.assertEqual(region, self.pixels[top:bottom, left:right].tobytes())
+        # Written through the shared memory, not sent back
+        np.testing.assert_array_equal(self.buffer.pixels[0, 0], 0)
+
+    def test_region_views_outlive_close(self):
+        shm = self.buffer._shm
+        region = self.buffer.region(BOX)
+        self.buffer.close()
+        left, top, right, bottom = BOX
+        np.testing.assert_array_equal(region, self.pixels[top:bottom, left:right])
+        self.assertIsNotNone(shm.buf)
+
+        del region
+        gc.collect()
+        self.assertIsNone(shm.buf)
+
+    def test_close_without_views_unmaps(self):
+        shm = self.buffer._shm
+        self.buffer.close()
+        self.assertIsNone(shm.buf)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,172 @@
+"""In-process tests of the extraction service through its HTTP client.
+
+Most tests replace main() with a stub, so they need neither the OCR model nor real documents.
+
+Usage:
+    python -m unittest test_service
+"""
+import logging
+import os
+import queue
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+import fitz
+
+import full_implementation_1
+import service
+from service import ExtractionService, ServiceClient, start_server, validate_options
+
+logger = logging.getLogger('PDFProcessor.test')
+
+
+def write_pdf(path: str, pages):
+    with fitz.open() as doc:
+        for text in pages:
+            doc.new_page().insert_text((72, 72), text)
+        doc.save(path)
+    return path
+
+
+class StubMain:
+    """Stands in for main(): reports one page per entry of pages, after release is set if block is true."""
+
+    def __init__(self, pages=("first page",), block: bool = False):
+        self.pages = pages
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def __call__(self, pdf_file, output_path, logger, queue, basic, spellcheck, **options):
+        self.release.wait(10)
+        for i, text in enumerate(self.pages):
+            queue.put(('page', (i, {"text": text, "source": "text_layer"})))
+            queue.put(('progress', (i + 1) / len(self.pages) * 100))
+        return {"output_path": "", "outputs": [], "pages": len(self.pages), "blank_pages": 0,
+                "sources": {"text_layer": len(self.pages)}, "metrics": {}}
+
+
+class ServiceTestCase(unittest.TestCase):
+    queue_size = 4
+    concurrency = 1
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.pdf = write_pdf(os.path.join(self.work_dir, "doc.pdf"), ["Hello service", "Second page"])
+        self.service = ExtractionService(os.path.join(self.work_dir, "out"), logger, self.queue_size,
+                                         self.concurrency, warm_up=False,
+                                         cache_path=os.path.join(self.work_dir, "cache.sqlite3"))
+        self.server = start_server(self.service)
+        self.client = ServiceClient(self.server.url, timeout=10)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.service.stop(10)
+        shutil.rmtree(self.work_dir)
+
+    def stub_main(self, stub: StubMain):
+        patcher = mock.patch.object(service, "main", stub)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(stub.release.set)
+        return stub
+
+
+class ValidateOptionsTest(unittest.TestCase):
+    def test_defaults_are_filled_in(self):
+        options = validate_options({"hybrid": True})
+        self.assertTrue(options["hybrid"])
+        self.assertEqual(options["output_formats"], ("txt",))
+
+    def test_bad_options_are_rejected(self):
+        for options in [{"foo": 1}, {"hybrid": "yes"}, {"batch_size": 0}, {"batch_size": True},
+                        {"batch_window": False}, {"resolution": "x"}, {"output_formats": ["pdf"]}]:
+            with self.subTest(options=options), self.assertRaises(ValueError):
+                validate_options(options)
+
+
+class JobEventsTest(ServiceTestCase):
+    def test_pages_stream_before_the_final_event(self):
+        self.stub_main(StubMain(pages=("one", "two")))
+        job = self.client.submit(self.pdf)
+        events = list(self.client.events(job["id"]))
+        self.assertEqual([event["type"] for event in events],
+                         ["started", "page", "progress", "page", "progress", "done"])
+        self.assertEqual([event["text"] for event in events if event["type"] == "page"], ["one", "two"])
+        self.assertEqual(events[-1]["result"]["pages"], 2)
+
+    def test_old_jobs_drop_page_text(self):
+        self.stub_main(StubMain(pages=("one", "two")))
+        jobs = []
+        for _ in range(service.MAX_JOBS_WITH_PAGES + 1):
+            jobs.append(self.service.submit(self.pdf))
+            list(jobs[-1].events())
+        # The service trims old jobs after their final event, when it counts them
+        while self.service.status()["done"] < len(jobs):
+            time.sleep(0.01)
+        pages = [event for event in jobs[0].events() if event["type"] == "page"]
+        self.assertEqual(pages, [{"type": "page", "page": 1, "source": "text_layer"},
+                                 {"type": "page", "page": 2, "source": "text_layer"}])
+        self.assertEqual([event["text"] for event in jobs[1].events() if event["type"] == "page"], ["one", "two"])
+
+    def test_bad_requests(self):
+        with self.assertRaises(ValueError):
+            self.client.submit(self.pdf, batch_size=True)
+        with self.assertRaises(ValueError):
+            self.client.submit(os.path.join(self.work_dir, "missing.pdf"))
+        with self.assertRaises(KeyError):
+            self.client.job("nope")
+
+    def test_text_layer_document(self):
+        job = self.client.submit(self.pdf, basic=True, output_formats=["txt", "jsonl"])
+        final = self.client.wait(job["id"], timeout=60)
+        self.assertEqual(final["status"], "done")
+        self.assertEqual(final["result"]["pages"], 2)
+        with open(final["result"]["outputs"][0], encoding="utf-8") as f:
+            self.assertIn("Hello service", f.read())
+        self.assertEqual(self.client.status()["pages"], 2)
+
+
+class BackpressureTest(ServiceTestCase):
+    queue_size = 1
+
+    def test_full_queue_is_refused(self):
+        stub = self.stub_main(StubMain(block=True))
+        running = self.client.submit(self.pdf)
+        self.assertEqual(next(self.client.events(running["id"]))["type"], "started")
+        waiting = self.client.submit(self.pdf)
+        with self.assertRaises(queue.Full):
+            self.client.submit(self.pdf)
+        self.assertEqual(self.client.status()["queued"], 1)
+
+        stub.release.set()
+        self.assertEqual(self.client.wait(running["id"])["status"], "done")
+        self.assertEqual(self.client.wait(waiting["id"])["status"], "done")
+        self.assertEqual(self.client.status()["done"], 2)
+
+    def test_stop_cancels_waiting_jobs(self):
+        stub = self.stub_main(StubMain(block=True))
+        running = self.service.submit(self.pdf)
+        next(running.events())
+        waiting = self.service.submit(self.pdf)
+
+        threading.Timer(0.2, stub.release.set).start()
+        self.service.stop(10)
+        self.assertEqual(running.status, "done")
+        self.assertEqual(waiting.status, "failed")
+        with self.assertRaises(queue.Full):
+            self.service.submit(self.pdf)
+
+    def test_stop_releases_the_ocr_model(self):
+        with mock.patch.dict(full_implementation_1._reader_cache, {("en",): object()}):
+            self.service.stop(10)
+            self.assertEqual(full_implementation_1._reader_cache, {})
+
+
+if __name__ == "__main__":
+    unittest.main()
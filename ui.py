@@ -1,18 +1,32 @@
 from poppler_installer import decider
 import threading
-import openpyxl
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
 import traceback
-import pandas as pd
 import logging
 import queue
-from full_implementation_1 import main
+import os
+import multiprocessing
+from collections import deque
+from full_implementation_1 import main, warm_up_reader, PREPROCESS_MODES, PREPROCESS_PROFILES
+from metrics import PROFILERS
+from result_cache import ResultCache
 
 name = 'PDF extractor'
+# Spelling corrections are kept between runs next to logs.log
+SPELLING_CACHE_PATH = 'spelling_cache.json'
+# Lines kept in the log view; the full log is in logs.log
+MAX_LOG_LINES = 2000
+# Queue messages handled per tick of process_queue, so a flood of log records cannot freeze the window
+MAX_QUEUE_BATCH = 5000
+QUEUE_POLL_MS = 100
+
 class Logger(tk.Frame):
-    def __init__(self, parent):
+    """Log view that keeps only the last max_lines lines."""
+
+    def __init__(self, parent, max_lines: int = MAX_LOG_LINES):
         super().__init__(parent)
+        self.max_lines = max_lines
         self.textbox = tk.Text(self, width=130, height=50, state="disabled")
         self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self.textbox.yview)
         self.textbox.config(yscrollcommand=self.scrollbar.set)
@@ -22,8 +36,22 @@ class Logger(tk.Frame):
         self.scrollbar.pack(side="right", fill="y")
 
     def log_text(self, text: str, tag: str) -> None:
+        self.log_lines([(text, tag)])
+
+    def log_lines(self, lines) -> None:
+        """Appends (text, tag) lines with a single widget update and drops the oldest lines over max_lines."""
+        lines = list(lines)[-self.max_lines:]
+        if not lines:
+            return
+        chunks = []
+        for text, tag in lines:
+            chunks.extend((f"{text}\n", tag))
         self.textbox.config(state="normal")
-        self.textbox.insert("end", f"{text}\n", tag)
+        self.textbox.insert("end", *chunks)
+        # The widget always ends with a newline, so it holds one line more than was inserted
+        excess = int(self.textbox.index("end-1c").split(".")[0]) - 1 - self.max_lines
+        if excess > 0:
+            self.textbox.delete("1.0", f"{excess + 1}.0")
         self.textbox.config(state="disabled")
         self.textbox.see(tk.END)
 
@@ -35,16 +63,31 @@ class Logger(tk.Frame):
 
 
 class TextHandler(logging.Handler):
-    """A custom logging handler that sends log messages to a Tkinter Text widget."""
+    """A logging handler that puts log messages on the UI queue for the Tk thread to display.
 
-    def __init__(self, logger_widget):
+    Tk widgets may only be touched from the thread running the main loop, and records come from
+    worker threads, so emit never writes to the widget itself.
+    """
+
+    def __init__(self, queue):
         super().__init__()
-        self.logger_widget = logger_widget
+        self.queue = queue
 
     def emit(self, record):
-        msg = self.format(record)
-        tag = "info" if record.levelno < logging.ERROR else "error"
-        self.logger_widget.log_text(msg, tag)
+        try:
+            msg = self.format(record)
+            tag = "info" if record.levelno < logging.ERROR else "error"
+            self.queue.put(('log', (msg, tag)))
+        except Exception:
+            self.handleError(record)
+
+
+def format_stage_summary(summary: dict) -> str:
+    lines = [f"{'stage':<12}{'runs':>6}{'total s':>10}{'CPU s':>9}{'p50 ms':>9}"]
+    for stage, stats in summary.items():
+        lines.append(f"{stage:<12}{stats['count']:>6}{stats['wall_s']:>10.1f}{stats['cpu_s']:>9.1f}"
+                     f"{stats['p50_ms']:>9.0f}")
+    return "\n".join(lines)
 
 
 class ExcelProcessorApp:
@@ -74,9 +117,56 @@ class ExcelProcessorApp:
         self.basic_var = tk.BooleanVar()
         self.basic_checkbox = tk.Checkbutton(root, text="Do you want basic extraction? (Faster)", variable=self.basic_var)
         self.basic_checkbox.pack(pady=5)
+        self.hybrid_var = tk.BooleanVar()
+        self.hybrid_checkbox = tk.Checkbutton(root, text="Use the text layer where pages have one and OCR only the rest?",
+                                              variable=self.hybrid_var)
+        self.hybrid_checkbox.pack(pady=5)
+        self.reading_order_var = tk.BooleanVar()
+        self.reading_order_checkbox = tk.Checkbutton(root, text="Sort text-layer blocks into reading order?",
+                                                     variable=self.reading_order_var)
+        self.reading_order_checkbox.pack(pady=5)
         self.spellcheck_var = tk.BooleanVar()
         self.spellcheck_checkbox = tk.Checkbutton(root, text="Do you need spelling check?", variable=self.spellcheck_var)
         self.spellcheck_checkbox.pack(pady=5)
+        self.workers_label = tk.Label(root, text="OCR worker processes:")
+        self.workers_label.pack(pady=5)
+        self.workers_var = tk.IntVar(value=1)
+        self.workers_spinbox = tk.Spinbox(root, from_=1, to=os.cpu_count() or 1, width=5, textvariable=self.workers_var)
+        self.workers_spinbox.pack(pady=5)
+        self.preprocess_label = tk.Label(root, text="Image preprocessing (off / ocr / debug) and profile:")
+        self.preprocess_label.pack(pady=5)
+        self.preprocess_var = tk.StringVar(value="off")
+        self.preprocess_combobox = ttk.Combobox(root, textvariable=self.preprocess_var, state="readonly", width=10,
+                                                values=PREPROCESS_MODES)
+        self.preprocess_combobox.pack(pady=5)
+        self.profile_var = tk.StringVar(value="quality")
+        self.profile_combobox = ttk.Combobox(root, textvariable=self.profile_var, state="readonly", width=10,
+                                             values=PREPROCESS_PROFILES)
+        self.profile_combobox.pack(pady=5)
+
+        self.adaptive_var = tk.BooleanVar()
+        self.adaptive_checkbox = tk.Checkbutton(root, text="Pick the OCR resolution per region from its text size?",
+                                                variable=self.adaptive_var)
+        self.adaptive_checkbox.pack(pady=5)
+
+        self.cache_var = tk.BooleanVar(value=True)
+        self.cache_checkbox = tk.Checkbutton(root, text="Reuse cached results for pages processed before?",
+                                             variable=self.cache_var)
+        self.cache_checkbox.pack(pady=5)
+        self.resume_var = tk.BooleanVar()
+        self.resume_checkbox = tk.Checkbutton(root, text="Resume an interrupted extraction of this file?",
+                                              variable=self.resume_var)
+        self.resume_checkbox.pack(pady=5)
+        self.clear_cache_button = tk.Button(root, text="Clear cache", command=self.clear_cache)
+        self.clear_cache_button.pack(pady=5)
+        self.metrics_var = tk.BooleanVar()
+        self.metrics_checkbox = tk.Checkbutton(root, text="Save a timing report next to the extracted text?",
+                                               variable=self.metrics_var)
+        self.metrics_checkbox.pack(pady=5)
+        self.profiler_var = tk.StringVar(value="off")
+        self.profiler_combobox = ttk.Combobox(root, textvariable=self.profiler_var, state="readonly", width=12,
+                                              values=PROFILERS)
+        self.profiler_combobox.pack(pady=5)
 
         # Submit button
         self.submit_button = tk.Button(root, text="Submit", command=self.process_excel)
@@ -90,10 +180,17 @@ class ExcelProcessorApp:
         self.progress_label = tk.Label(root, text="")
         self.progress_label.pack(pady=5)
 
+        # Live time breakdown per pipeline stage
+        self.stages_label = tk.Label(root, text="", font=("Courier", 9), justify="left")
+        self.stages_label.pack(pady=5)
+
         # Logging area
         self.logger_frame = Logger(root)
         self.logger_frame.pack(pady=10)
 
+        # Queue for communication between threads
+        self.queue = queue.Queue()
+
         # Configure logger
         self.logger = logging.getLogger('PDFProcessor')
         self.logger.setLevel(logging.DEBUG)
@@ -112,20 +209,34 @@ class ExcelProcessorApp:
         self.logger.addHandler(file_handler)
 
         # Create a custom handler for displaying logs in the UI
-        ui_handler = TextHandler(self.logger_frame)
+        ui_handler = TextHandler(self.queue)
         ui_handler.setLevel(logging.DEBUG)
         ui_handler.setFormatter(formatter)
         self.logger.addHandler(ui_handler)
 
-        # Queue for communication between threads
-        self.queue = queue.Queue()
-        self.root.after(100, self.process_queue)
+        self.root.after(QUEUE_POLL_MS, self.process_queue)
+
+        # Not at launch: text-layer extraction must not import torch, and an OCR job loads the model itself
+        self.warm_up_started = False
+        self.basic_var.trace_add("write", self.start_warm_up)
+        self.hybrid_var.trace_add("write", self.start_warm_up)
+
+    def ocr_selected(self) -> bool:
+        return not self.basic_var.get() or self.hybrid_var.get()
+
+    def start_warm_up(self, *_):
+        """Loads the OCR model in the background once a source file is chosen with an OCR mode selected."""
+        if self.warm_up_started or not self.ocr_selected() or not self.source_entry.get():
+            return
+        self.warm_up_started = True
+        threading.Thread(target=warm_up_reader, args=(self.logger,), daemon=True).start()
 
     def browse_source_file(self):
         file_path = filedialog.askopenfilename(filetypes=[("PDF files", "*.pdf")])
         if file_path:
             self.source_entry.delete(0, tk.END)
             self.source_entry.insert(0, file_path)
+            self.start_warm_up()
 
     def browse_dest_file(self):
         file_path = filedialog.askdirectory()
@@ -138,21 +249,41 @@ class ExcelProcessorApp:
         dest_file = self.dest_entry.get()
         basic = self.basic_var.get()
         spellcheck = self.spellcheck_var.get()
+        hybrid = self.hybrid_var.get()
+        text_layout = "blocks" if self.reading_order_var.get() else "plain"
+        use_cache = self.cache_var.get()
+        resume = self.resume_var.get()
+        profiler = self.profiler_var.get()
+        resolution = "adaptive" if self.adaptive_var.get() else "fixed"
+        metrics_report = self.metrics_var.get() or profiler != "off"
+        preprocess = self.preprocess_var.get()
+        preprocess_profile = self.profile_var.get()
+        try:
+            workers = max(1, self.workers_var.get())
+        except tk.TclError:
+            messagebox.showerror("Error", "Number of worker processes must be a whole number")
+            return
 
         if not source_file or not dest_file:
             messagebox.showerror("Error", "Please select both source and destination files")
             return
 
-        threading.Thread(target=self.process_excel_thread, args=(source_file, dest_file, basic, spellcheck)).start()
+        threading.Thread(target=self.process_excel_thread, args=(source_file, dest_file, basic, spellcheck, workers, preprocess,
+                                                                     preprocess_profile, hybrid, text_layout,
+                                                                     use_cache, resume, metrics_report,
+                                                                     profiler, resolution)).start()
 
-    def process_excel_thread(self, source_file, dest_file, basic, spellcheck):
+    def process_excel_thread(self, source_file, dest_file, basic, spellcheck, workers, preprocess, preprocess_profile,
+                             hybrid, text_layout, use_cache, resume, metrics_report, profiler, resolution):
         try:
             self.queue.put(('submit_button', 'disabled'))
             self.queue.put(('progress', 0))
             self.queue.put(('progress_label', "0% (0/0)"))
             self.logger.info(f"Starting PDF extraction. Source path: {source_file}. Dest path: {dest_file}")
             decider(self.logger)
-            main(source_file, dest_file, self.logger, self.queue, basic, spellcheck)
+            main(source_file, dest_file, self.logger, self.queue, basic, spellcheck, workers, preprocess,
+                 preprocess_profile, hybrid, text_layout, SPELLING_CACHE_PATH, use_cache=use_cache,
+                 resume=resume, metrics_report=metrics_report, profiler=profiler, resolution=resolution)
             # # Read the source Excel file
             # df = pd.read_excel(source_file)
             # total_rows = len(df)
@@ -186,26 +317,62 @@ class ExcelProcessorApp:
             self.queue.put(('progress', 100))
             self.queue.put(('quit',))
 
+    def clear_cache(self):
+        if not messagebox.askyesno("Clear cache", "Delete all cached page results?"):
+            return
+        try:
+            ResultCache().clear()
+            self.logger.info("Result cache cleared.")
+        except Exception as e:
+            self.logger.error(f"Could not clear the result cache: {e}")
+
     def process_queue(self):
-        while not self.queue.empty():
-            msg = self.queue.get()
-            if msg[0] == 'submit_button':
+        """Handles the messages queued since the last tick in one batch.
+
+        Log lines are collected and inserted with one widget update, and only the latest progress,
+        label and stage summary of the batch are shown.
+        """
+        log_lines = deque(maxlen=MAX_LOG_LINES)
+        latest = {}
+        for _ in range(MAX_QUEUE_BATCH):
+            try:
+                msg = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if msg[0] == 'log':
+                log_lines.append(msg[1])
+            elif msg[0] in ('progress', 'progress_label', 'metrics'):
+                latest[msg[0]] = msg[1]
+            elif msg[0] == 'submit_button':
                 self.submit_button.config(state=msg[1])
-            elif msg[0] == 'progress':
-                self.progress['value'] = msg[1]
-            elif msg[0] == 'progress_label':
-                self.progress_label.config(text=msg[1])
             elif msg[0] == 'messagebox':
+                # The dialog blocks this tick, so show everything that came before it first
+                self.show_updates(log_lines, latest)
                 if msg[1][0] == 'info':
                     messagebox.showinfo("Info", msg[1][1])
                 elif msg[1][0] == 'error':
                     messagebox.showerror("Error", msg[1][1])
             elif msg[0] == 'quit':
+                self.show_updates(log_lines, latest)
                 self.root.quit()
-        self.root.after(100, self.process_queue)
+        self.show_updates(log_lines, latest)
+        self.root.after(QUEUE_POLL_MS, self.process_queue)
+
+    def show_updates(self, log_lines: deque, latest: dict):
+        self.logger_frame.log_lines(log_lines)
+        log_lines.clear()
+        if 'progress' in latest:
+            self.progress['value'] = latest['progress']
+        if 'progress_label' in latest:
+            self.progress_label.config(text=latest['progress_label'])
+        if 'metrics' in latest:
+            self.stages_label.config(text=format_stage_summary(latest['metrics']))
+        latest.clear()
 
 
 if __name__ == "__main__":
+    # Required for the OCR worker processes when running as a frozen executable
+    multiprocessing.freeze_support()
     root = tk.Tk()
     app = ExcelProcessorApp(root)
     root.mainloop()